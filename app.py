@@ -4,21 +4,53 @@ Sources: Google Scholar, News, Substack, Archives, Academic DBs
 AI: Google Gemini Flash 2.5 for summarization
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import asyncio
+import atexit
+import codecs
+import contextlib
+import copy
+import hashlib
+import zlib
+import heapq
+import ipaddress
 import os
-import requests
-import xml.etree.ElementTree as ET
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Callable, Awaitable
+from dataclasses import dataclass, asdict, field
 import json
+import queue
+import socket
 import time
-from urllib.parse import quote_plus
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+import aiohttp
+from aiohttp.abc import AbstractResolver
+import numpy as np
+from urllib.parse import quote_plus, urldefrag, urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
 import google.generativeai as genai
 from bs4 import BeautifulSoup
 import re
+import base64
+import sqlite3
+import tempfile
+import math
+from collections import Counter, OrderedDict, deque
+from collections.abc import Mapping
+from functools import lru_cache
+from itertools import chain
+from html.parser import HTMLParser
+from sources import (API_KEY_NAMES, SOURCE_ADAPTERS, SOURCE_CATEGORIES, SOURCE_REGISTRY,
+                     SourceAdapter, SourceRequest, adapters_for)
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
 
 app = Flask(__name__)
 
@@ -36,490 +68,1585 @@ if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
     model = genai.GenerativeModel('gemini-2.0-flash-exp')
 
+# Fan-out settings: every enabled source runs concurrently and the whole
+# search is bounded by a per-query deadline (kept below gunicorn's --timeout)
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', '20'))
+HTTP_TIMEOUT_SECONDS = float(os.getenv('HTTP_TIMEOUT_SECONDS', '10'))
+
+class BackgroundEventLoop:
+    """One long-lived asyncio loop per worker process, running in a daemon thread.
+    
+    Flask views are synchronous, so they hand coroutines to this loop instead of
+    creating a fresh loop per request. All upstream I/O is multiplexed on it.
+    """
+    
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        # Restart after fork: gunicorn workers must not share the parent's loop
+        if self._loop is None or self._pid != os.getpid():
+            with self._lock:
+                if self._loop is None or self._pid != os.getpid():
+                    self._loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=self._loop.run_forever,
+                                                    name='event-loop', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+        return self._loop
+    
+    def submit(self, coro) -> Future:
+        """Schedule a coroutine on the loop and return a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    def run(self, coro, timeout: Optional[float] = None):
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        return self.submit(coro).result(timeout)
+    
+    def run_all(self, *coros, timeout: Optional[float] = None) -> list:
+        """Run several coroutines concurrently on the loop and return their results in order"""
+        async def gather():
+            return await asyncio.gather(*coros)
+        return self.run(gather(), timeout)
+
+event_loop = BackgroundEventLoop()
+
 @dataclass
-class ResearchResult:
-    title: str
-    url: str
-    snippet: str
-    source_type: str
-    relevance_score: float
-    published_date: str = ""
-    authors: str = ""
-    ai_summary: str = ""
-    relevance_explanation: str = ""
-    content_preview: str = ""
-    source_name: str = ""
+class HostPoolConfig:
+    """Connection pool settings for one upstream host"""
+    max_connections: int = 20
+    retries: int = 1
+    timeout: float = HTTP_TIMEOUT_SECONDS
+    keepalive: float = 60.0
+    # Freshness assumed for GET responses that carry no Cache-Control/Expires (0 = revalidate only)
+    heuristic_ttl: float = 0.0
 
-class EnhancedSearchAgent:
-    """Multi-source search agent with expanded coverage"""
+DEFAULT_POOL_CONFIG = HostPoolConfig()
+
+# Tuned to each upstream's rate limits and typical response times
+HOST_POOL_CONFIG = {
+    'google.serper.dev': HostPoolConfig(max_connections=50, retries=1),
+    'newsapi.org': HostPoolConfig(max_connections=10, retries=1),
+    'api.search.brave.com': HostPoolConfig(max_connections=10, retries=1),
+    'api.semanticscholar.org': HostPoolConfig(max_connections=10, retries=2),
+    'export.arxiv.org': HostPoolConfig(max_connections=4, retries=2, timeout=15.0, heuristic_ttl=3600),
+    'eutils.ncbi.nlm.nih.gov': HostPoolConfig(max_connections=6, retries=2, heuristic_ttl=3600),
+    'archive.org': HostPoolConfig(max_connections=10, retries=2, timeout=15.0, heuristic_ttl=3600),
+}
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Hosts without their own pool (result pages, crawl targets) share one session
+# whose connector caps connections per host; there can be thousands of them
+WEB_POOL_HOST = '*'
+WEB_POOL_MAX_CONNECTIONS = int(os.getenv('WEB_POOL_MAX_CONNECTIONS', '100'))
+WEB_POOL_PER_HOST = int(os.getenv('WEB_POOL_PER_HOST', '4'))
+
+# Page fetches (content stage, crawler) go to URLs that callers and search results
+# choose, so loopback, private and link-local addresses are refused unless
+# WEB_FETCH_ALLOW_PRIVATE is set (e.g. to crawl a local test server). Redirects
+# are followed one hop at a time so every target is checked.
+WEB_FETCH_ALLOW_PRIVATE = os.getenv('WEB_FETCH_ALLOW_PRIVATE', 'false').lower() in ('1', 'true', 'yes')
+WEB_FETCH_MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+
+def is_public_address(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address.split('%', 1)[0])
+    except ValueError:
+        return False
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+def check_fetchable(url: str):
+    """Raise InvalidURL for non-http(s) URLs and literal non-public addresses; names are checked at resolution"""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise aiohttp.InvalidURL(url, 'only http(s) URLs can be fetched')
+    if WEB_FETCH_ALLOW_PRIVATE:
+        return
+    try:
+        ipaddress.ip_address(parts.hostname)
+    except ValueError:
+        return
+    if not is_public_address(parts.hostname):
+        raise aiohttp.InvalidURL(url, 'address is not public')
+
+class PublicAddressResolver(AbstractResolver):
+    """Resolver for the shared web pool that drops non-public addresses, so DNS cannot point a fetch inside the network"""
     
     def __init__(self):
-        self.serper_api_key = os.getenv('SERPER_API_KEY')
-        self.brave_api_key = os.getenv('BRAVE_API_KEY')
-        self.semantic_scholar_api_key = os.getenv('SEMANTIC_SCHOLAR_API_KEY')
-        self.newsapi_key = os.getenv('NEWSAPI_KEY')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        self._resolver = aiohttp.DefaultResolver()
     
-    def search_google_scholar(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Google Scholar via Serper or Brave"""
-        if not self.serper_api_key:
-            return []
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> list:
+        addresses = await self._resolver.resolve(host, port, family)
+        if WEB_FETCH_ALLOW_PRIVATE:
+            return addresses
+        public = [address for address in addresses if is_public_address(address['host'])]
+        if not public:
+            raise OSError(f"{host} resolves only to non-public addresses")
+        return public
+    
+    async def close(self):
+        await self._resolver.close()
+
+# Hedged requests: an idempotent GET still unanswered at its observed p90 gets a
+# duplicate, and the first reply wins. Hedges are capped at HEDGE_BUDGET_RATIO
+# of hedge-eligible requests so a slow upstream never sees doubled load.
+HEDGED_REQUESTS = os.getenv('HEDGED_REQUESTS', 'true').lower() in ('1', 'true', 'yes')
+HEDGE_BUDGET_RATIO = float(os.getenv('HEDGE_BUDGET_RATIO', '0.1'))
+HEDGE_BUDGET_BURST = 5.0
+
+class HedgeBudget:
+    """Token bucket earning HEDGE_BUDGET_RATIO of a hedge per eligible request"""
+    
+    def __init__(self, ratio: float = HEDGE_BUDGET_RATIO, burst: float = HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst
+    
+    def deposit(self):
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+    
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class PooledHTTPClient:
+    """Process-wide keep-alive connection pools, one per upstream host.
+    
+    Each host gets its own aiohttp session and connector sized from
+    HOST_POOL_CONFIG, so a burst against one API cannot starve the others.
+    Connection reuse is tracked per host and exposed through stats().
+    """
+    
+    def __init__(self, host_config: Optional[Dict[str, HostPoolConfig]] = None,
+                 cache: Optional['HTTPCache'] = None):
+        self.host_config = host_config if host_config is not None else HOST_POOL_CONFIG
+        self.cache = cache
+        self._sessions = {}
+        self._stats = {}
+        self._hedge_latency = {}
+        self.hedge_budget = HedgeBudget()
+    
+    def config_for(self, host: str) -> HostPoolConfig:
+        return self.host_config.get(host, DEFAULT_POOL_CONFIG)
+    
+    def _host_stats(self, host: str) -> Dict[str, int]:
+        return self._stats.setdefault(host, {'requests': 0, 'hits': 0, 'misses': 0, 'retries': 0, 'errors': 0,
+                                             'hedges': 0, 'hedge_wins': 0, 'cache_hits': 0, 'not_modified': 0})
+    
+    def _trace_config(self, host: str) -> aiohttp.TraceConfig:
+        stats = self._host_stats(host)
+        trace = aiohttp.TraceConfig()
         
-        url = "https://google.serper.dev/scholar"
-        payload = json.dumps({"q": query, "num": num_results})
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
+        async def on_reuse(session, ctx, params):
+            stats['hits'] += 1
         
-        try:
-            response = requests.post(url, headers=headers, data=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('organic', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source_type': 'academic',
-                    'source_name': 'Google Scholar',
-                    'published_date': item.get('year', ''),
-                    'authors': item.get('publication', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Google Scholar error: {e}")
-            return []
+        async def on_create(session, ctx, params):
+            stats['misses'] += 1
+        
+        trace.on_connection_reuseconn.append(on_reuse)
+        trace.on_connection_create_end.append(on_create)
+        return trace
     
-    def search_google_news(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Google News via Serper"""
-        if not self.serper_api_key:
-            return []
+    def session_for(self, host: str) -> aiohttp.ClientSession:
+        # Created lazily so each session binds to the running background loop
+        if host not in self.host_config:
+            host = WEB_POOL_HOST
+        session = self._sessions.get(host)
+        if session is None or session.closed:
+            config = self.config_for(host)
+            if host == WEB_POOL_HOST:
+                connector = aiohttp.TCPConnector(limit=WEB_POOL_MAX_CONNECTIONS, limit_per_host=WEB_POOL_PER_HOST,
+                                                 keepalive_timeout=config.keepalive,
+                                                 resolver=PublicAddressResolver())
+            else:
+                connector = aiohttp.TCPConnector(limit=config.max_connections, keepalive_timeout=config.keepalive)
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=config.timeout),
+                headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+                trace_configs=[self._trace_config(host)]
+            )
+            self._sessions[host] = session
+        return session
+    
+    async def request(self, method: str, url: str, hedge: Optional[str] = None, **kwargs) -> bytes:
+        """Fetch a URL through its host pool.
         
-        url = "https://google.serper.dev/news"
-        payload = json.dumps({"q": query, "num": num_results})
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
+        GETs go through the HTTP cache when one is configured: fresh entries are
+        served locally and stale ones revalidated, so an unchanged payload costs a 304.
+        hedge names the latency class (usually the source) for an idempotent
+        request that may be duplicated once it outlives that class's p90.
+        """
+        if not self.cache or not self.cache.db_path:
+            return (await self._hedged(method, url, hedge, **kwargs))[2]
         
-        try:
-            response = requests.post(url, headers=headers, data=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('news', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source_type': 'news',
-                    'source_name': item.get('source', 'News'),
-                    'published_date': item.get('date', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Google News error: {e}")
-            return []
+        # Cache I/O is SQLite plus zlib, so it runs in worker threads rather than on the loop
+        host = urlsplit(url).hostname or ''
+        params, headers = kwargs.get('params'), kwargs.get('headers') or {}
+        if method != 'GET':
+            body = (await self._hedged(method, url, hedge, **kwargs))[2]
+            # Most unsafe requests (Serper's POSTs) target URLs that are never stored
+            if url in self.cache.urls:
+                await asyncio.to_thread(self.cache.invalidate, url)
+            return body
+        
+        entry = await asyncio.to_thread(self.cache.lookup, url, params, headers)
+        if entry and entry['fresh']:
+            self._host_stats(host)['cache_hits'] += 1
+            return entry['body']
+        if entry:
+            kwargs['headers'] = {**headers, **entry['validators']}
+        
+        status, response_headers, body = await self._hedged(method, url, hedge, **kwargs)
+        if entry and status == 304:
+            self._host_stats(host)['not_modified'] += 1
+            await asyncio.to_thread(self.cache.refresh, entry, response_headers, self.config_for(host).heuristic_ttl)
+            return entry['body']
+        if status in HTTP_CACHEABLE_STATUSES:
+            await asyncio.to_thread(self.cache.store, url, params, headers, status, response_headers, body,
+                                    self.config_for(host).heuristic_ttl)
+        return body
     
-    def search_newsapi(self, query: str, num_results: int = 10) -> List[Dict]:
-        """NewsAPI - Multiple news sources"""
-        if not self.newsapi_key:
-            return []
+    async def _hedged(self, method: str, url: str, hedge: Optional[str] = None, **kwargs) -> tuple:
+        if not hedge or not HEDGED_REQUESTS:
+            return await self._request(method, url, **kwargs)
         
-        url = "https://newsapi.org/v2/everything"
-        params = {
-            'q': query,
-            'pageSize': num_results,
-            'sortBy': 'relevancy',
-            'language': 'en',
-            'apiKey': self.newsapi_key
-        }
+        tracker = self._hedge_latency.setdefault(hedge, LatencyTracker())
+        delay = tracker.percentile(90)
+        self.hedge_budget.deposit()
+        started = time.monotonic()
         
+        primary = asyncio.ensure_future(self._request(method, url, **kwargs))
+        pending = {primary}
+        backup = None
+        error = None
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done and self.hedge_budget.withdraw():
+                    self._host_stats(urlsplit(url).hostname or '')['hedges'] += 1
+                    backup = asyncio.ensure_future(self._request(method, url, **kwargs))
+                    pending.add(backup)
             
-            results = []
-            for article in data.get('articles', [])[:num_results]:
-                results.append({
-                    'title': article.get('title', ''),
-                    'url': article.get('url', ''),
-                    'snippet': article.get('description', '') or article.get('content', ''),
-                    'source_type': 'news',
-                    'source_name': article.get('source', {}).get('name', 'News'),
-                    'published_date': article.get('publishedAt', '')[:10],
-                    'authors': article.get('author', '')
-                })
-            return results
-        except Exception as e:
-            print(f"NewsAPI error: {e}")
-            return []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._host_stats(urlsplit(url).hostname or '')['hedge_wins'] += 1
+                        tracker.record(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
     
-    def search_substack(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Substack articles via web search"""
-        if not self.serper_api_key:
-            return []
+    async def _request(self, method: str, url: str, **kwargs) -> tuple:
+        """(status, headers, body) after retries; error statuses raise"""
+        host = urlsplit(url).hostname or ''
+        config = self.config_for(host)
+        session = self.session_for(host)
+        stats = self._host_stats(host)
         
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            "q": f"{query} site:substack.com",
-            "num": num_results
-        })
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
+        for attempt in range(config.retries + 1):
+            stats['requests'] += 1
+            try:
+                async with session.request(method, url, **kwargs) as response:
+                    if response.status in RETRY_STATUSES and attempt < config.retries:
+                        stats['retries'] += 1
+                        await asyncio.sleep(0.25 * 2 ** attempt)
+                        continue
+                    response.raise_for_status()
+                    return response.status, response.headers, await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= config.retries:
+                    stats['errors'] += 1
+                    raise
+                stats['retries'] += 1
+                await asyncio.sleep(0.25 * 2 ** attempt)
+            except aiohttp.ClientResponseError:
+                stats['errors'] += 1
+                raise
+    
+    @contextlib.asynccontextmanager
+    async def open(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                   max_redirects: int = WEB_FETCH_MAX_REDIRECTS):
+        """GET a page without reading the body, so the caller can stream and stop early.
         
-        try:
-            response = requests.post(url, headers=headers, data=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('organic', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source_type': 'blog',
-                    'source_name': 'Substack',
-                    'published_date': item.get('date', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Substack error: {e}")
-            return []
+        No retries: page fetches are best-effort and must not hammer the host.
+        Each redirect hop is checked like the original URL; past max_redirects the
+        3xx response itself is yielded.
+        """
+        kwargs = {'timeout': aiohttp.ClientTimeout(total=timeout)} if timeout else {}
+        for hop in range(max_redirects + 1):
+            host = urlsplit(url).hostname or ''
+            # Arbitrary page hosts are counted together, like the session they share
+            stats = self._host_stats(host if host in self.host_config else WEB_POOL_HOST)
+            stats['requests'] += 1
+            try:
+                check_fetchable(url)
+                async with self.session_for(host).get(url, headers=headers, allow_redirects=False,
+                                                      **kwargs) as response:
+                    location = response.headers.get('Location')
+                    if response.status in REDIRECT_STATUSES and location and hop < max_redirects:
+                        url = urljoin(url, location)
+                        continue
+                    yield response
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats['errors'] += 1
+                raise
     
-    def search_medium(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Medium articles via web search"""
-        if not self.serper_api_key:
-            return []
+    async def close(self):
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+    
+    async def get_json(self, url: str, **kwargs) -> Any:
+        return json.loads(await self.request('GET', url, **kwargs))
+    
+    async def post_json(self, url: str, **kwargs) -> Any:
+        return json.loads(await self.request('POST', url, **kwargs))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Per-host request counts and connection reuse (hits = reused keep-alive connections)"""
+        hosts = {}
+        for host, stats in self._stats.items():
+            connections = stats['hits'] + stats['misses']
+            hosts[host] = dict(stats,
+                               hit_rate=round(stats['hits'] / connections, 3) if connections else 0.0,
+                               max_connections=self.config_for(host).max_connections)
+        return hosts
+
+# HTTP cache under the source adapters (RFC 9111, private cache): GET responses
+# are stored zlib-compressed in SQLite, served while fresh per Cache-Control /
+# Expires and revalidated with ETag / Last-Modified once stale. The store is
+# bounded by HTTP_CACHE_MAX_BYTES, evicting least recently used entries.
+# Set HTTP_CACHE_DB to an empty string to disable.
+HTTP_CACHE_DB = os.getenv('HTTP_CACHE_DB', os.path.join(tempfile.gettempdir(), 'http_cache.sqlite3'))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+HTTP_CACHEABLE_STATUSES = {200, 203, 300, 301, 404, 410}
+HTTP_HEURISTIC_FRACTION = 0.1
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+def parse_http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+class HTTPCache:
+    """Disk-backed HTTP response cache with conditional revalidation and size-bounded LRU eviction"""
+    
+    def __init__(self, db_path: str = HTTP_CACHE_DB, max_bytes: int = HTTP_CACHE_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        # Running size of the store and the URLs in it, so writes need no table scans;
+        # other workers' writes are picked up when eviction recounts
+        self.total_bytes = 0
+        self.urls = set()
+        if self.db_path:
+            try:
+                db = self._db()
+                db.execute(
+                    'CREATE TABLE IF NOT EXISTS responses ('
+                    'key TEXT PRIMARY KEY, url TEXT, vary TEXT, body BLOB, etag TEXT, last_modified TEXT, '
+                    'fresh_until REAL, size INTEGER, last_access REAL)'
+                )
+                db.execute('CREATE INDEX IF NOT EXISTS responses_url ON responses (url)')
+                db.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+                self.total_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+                self.urls = {url for (url,) in db.execute('SELECT DISTINCT url FROM responses')}
+            except sqlite3.Error as e:
+                print(f"HTTP cache disabled: {e}")
+                self.db_path = ''
+    
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def key(url: str, params: Any) -> str:
+        # Mappings in any order are the same query; (key, value) pairs keep their order
+        if isinstance(params, Mapping):
+            pairs = sorted((str(k), str(v)) for k, v in params.items())
+        else:
+            pairs = [(str(k), str(v)) for k, v in params or []]
+        query = json.dumps(pairs)
+        return hashlib.sha256(f"{url}|{query}".encode('utf-8')).hexdigest()
+    
+    @staticmethod
+    def freshness(headers, heuristic_ttl: float) -> Optional[float]:
+        """Freshness lifetime in seconds from the response headers; None means the response must not be stored"""
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives:
+            return None
+        if 'no-cache' in directives:
+            return 0.0
         
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({
-            "q": f"{query} site:medium.com",
-            "num": num_results
-        })
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
+        age = float(headers['Age']) if (headers.get('Age') or '').isdigit() else 0.0
+        if directives.get('max-age') is not None:
+            try:
+                return max(0.0, int(directives['max-age']) - age)
+            except ValueError:
+                return 0.0
+        if headers.get('Expires') is not None:
+            # An invalid Expires means already expired
+            expires = parse_http_date(headers['Expires'])
+            served = parse_http_date(headers.get('Date')) or time.time()
+            return max(0.0, expires - served - age) if expires else 0.0
         
+        # Heuristic freshness: a fraction of the time since last modification, else the host default
+        last_modified = parse_http_date(headers.get('Last-Modified'))
+        if last_modified:
+            served = parse_http_date(headers.get('Date')) or time.time()
+            return max(0.0, (served - last_modified) * HTTP_HEURISTIC_FRACTION - age)
+        return max(0.0, heuristic_ttl - age)
+    
+    def lookup(self, url: str, params: Any, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Stored entry for this request: body, whether it is fresh, and the validators to revalidate it"""
         try:
-            response = requests.post(url, headers=headers, data=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('organic', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source_type': 'blog',
-                    'source_name': 'Medium',
-                    'published_date': item.get('date', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Medium error: {e}")
-            return []
+            row = self._db().execute(
+                'SELECT key, vary, body, etag, last_modified, fresh_until FROM responses WHERE key = ?',
+                (self.key(url, params),)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"HTTP cache read error: {e}")
+            row = None
+        
+        # A stored response only answers requests that match it on every Vary header
+        headers = {name.lower(): value for name, value in headers.items()}
+        if row is None or any(headers.get(name) != value for name, value in json.loads(row[1]).items()):
+            self.stats['misses'] += 1
+            return None
+        
+        key, _, body, etag, last_modified, fresh_until = row
+        fresh = fresh_until > time.time()
+        if not fresh and not etag and not last_modified:
+            self.stats['misses'] += 1
+            return None
+        
+        self._touch(key)
+        validators = {}
+        if etag:
+            validators['If-None-Match'] = etag
+        if last_modified:
+            validators['If-Modified-Since'] = last_modified
+        self.stats['hits' if fresh else 'revalidated'] += 1
+        return {'key': key, 'body': zlib.decompress(body), 'fresh': fresh, 'validators': validators}
     
-    def search_internet_archive(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Internet Archive search"""
-        url = "https://archive.org/advancedsearch.php"
-        params = {
-            'q': query,
-            'rows': num_results,
-            'page': 1,
-            'output': 'json',
-            'fl[]': ['identifier', 'title', 'description', 'date', 'creator']
-        }
+    def store(self, url: str, params: Any, request_headers: Dict[str, str], status: int,
+              headers, body: bytes, heuristic_ttl: float = 0.0):
+        if status not in HTTP_CACHEABLE_STATUSES:
+            return
+        vary = [name.strip().lower() for name in (headers.get('Vary') or '').split(',') if name.strip()]
+        lifetime = self.freshness(headers, heuristic_ttl)
+        if lifetime is None or '*' in vary:
+            return
+        if lifetime <= 0 and not headers.get('ETag') and not headers.get('Last-Modified'):
+            return
         
+        compressed = zlib.compress(body, 6)
+        if len(compressed) > self.max_bytes // 10:
+            return
+        request_headers = {name.lower(): value for name, value in request_headers.items()}
+        vary_values = {name: request_headers.get(name) for name in vary}
+        key = self.key(url, params)
+        now = time.time()
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('response', {}).get('docs', [])[:num_results]:
-                identifier = item.get('identifier', '')
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': f"https://archive.org/details/{identifier}",
-                    'snippet': item.get('description', [''])[0] if isinstance(item.get('description'), list) else item.get('description', ''),
-                    'source_type': 'archive',
-                    'source_name': 'Internet Archive',
-                    'published_date': item.get('date', ''),
-                    'authors': item.get('creator', [''])[0] if isinstance(item.get('creator'), list) else item.get('creator', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Internet Archive error: {e}")
-            return []
+            db = self._db()
+            replaced = db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO responses '
+                '(key, url, vary, body, etag, last_modified, fresh_until, size, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, url, json.dumps(vary_values), compressed, headers.get('ETag'),
+                 headers.get('Last-Modified'), now + lifetime, len(compressed), now)
+            )
+            self.stats['stored'] += 1
+            with self._lock:
+                self.urls.add(url)
+                self.total_bytes += len(compressed) - (replaced[0] if replaced else 0)
+                over_budget = self.total_bytes > self.max_bytes
+            if over_budget:
+                self.evict()
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
     
-    def search_semantic_scholar(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Semantic Scholar API"""
-        url = "https://api.semanticscholar.org/graph/v1/paper/search"
-        headers = {}
-        if self.semantic_scholar_api_key:
-            headers['x-api-key'] = self.semantic_scholar_api_key
+    def refresh(self, entry: Dict[str, Any], headers, heuristic_ttl: float = 0.0):
+        """Apply a 304's headers to the stored response (RFC 9111 section 4.3.4)"""
+        lifetime = self.freshness(headers, heuristic_ttl)
+        try:
+            if lifetime is None:
+                self._db().execute('DELETE FROM responses WHERE key = ?', (entry['key'],))
+                return
+            self._db().execute(
+                'UPDATE responses SET fresh_until = ?, etag = COALESCE(?, etag), '
+                'last_modified = COALESCE(?, last_modified) WHERE key = ?',
+                (time.time() + lifetime, headers.get('ETag'), headers.get('Last-Modified'), entry['key'])
+            )
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+    
+    def invalidate(self, url: str):
+        """Unsafe methods invalidate what is stored for their target URL"""
+        with self._lock:
+            self.urls.discard(url)
+        try:
+            self._db().execute('DELETE FROM responses WHERE url = ?', (url,))
+        except sqlite3.Error as e:
+            print(f"HTTP cache write error: {e}")
+    
+    def _touch(self, key: str):
+        try:
+            self._db().execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error:
+            pass
+    
+    def evict(self):
+        """Drop least recently used responses until the store is back under 90% of its budget.
         
-        params = {
-            'query': query,
-            'limit': num_results,
-            'fields': 'title,authors,year,abstract,url,publicationDate,venue'
-        }
+        Only runs once the running total passes the budget; the exact size is
+        recounted here since other workers write to the same store.
+        """
+        db = self._db()
+        total = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        target = self.max_bytes * 0.9
+        if total > self.max_bytes:
+            for key, size in db.execute('SELECT key, size FROM responses ORDER BY last_access').fetchall():
+                if total <= target:
+                    break
+                db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                total -= size
+                self.stats['evicted'] += 1
+        with self._lock:
+            self.total_bytes = total
+    
+    def size(self) -> Dict[str, int]:
+        try:
+            entries, total = self._db().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        except sqlite3.Error:
+            entries, total = 0, 0
+        return {'entries': entries, 'bytes': total, 'max_bytes': self.max_bytes}
+
+http_client = PooledHTTPClient(cache=HTTPCache())
+
+# Request coalescing: concurrent POSTs to an endpoint that accepts an array of
+# queries (Serper) are held for a few milliseconds and sent as one request
+REQUEST_BATCHING = os.getenv('REQUEST_BATCHING', 'true').lower() in ('1', 'true', 'yes')
+BATCH_WINDOW_SECONDS = float(os.getenv('BATCH_WINDOW_MS', '10')) / 1000
+
+class RequestBatcher:
+    """Coalesces batchable JSON requests to the same endpoint and splits the array response"""
+    
+    def __init__(self, window: float = BATCH_WINDOW_SECONDS):
+        self.window = window
+        self._pending = {}
+        self._flushes = set()
+        self.stats = {'batches': 0, 'batched_requests': 0, 'single_requests': 0}
+    
+    async def fetch(self, spec: SourceRequest) -> Any:
+        loop = asyncio.get_running_loop()
+        # Requests only share a batch when everything but the body matches (URL, API key)
+        key = (spec.method, spec.url, tuple(sorted(spec.headers.items())))
+        future = loop.create_future()
+        pending = self._pending.setdefault(key, [])
+        pending.append((spec, future))
+        if len(pending) == 1:
+            loop.call_later(self.window, self._start_flush, key)
+        return await future
+    
+    def _start_flush(self, key: tuple):
+        task = asyncio.ensure_future(self._flush(key))
+        # The loop only keeps weak references to tasks
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+    
+    async def _flush(self, key: tuple):
+        # Callers that timed out or were cancelled while waiting drop out of the batch
+        waiting = [(spec, future) for spec, future in self._pending.pop(key, []) if not future.done()]
+        if not waiting:
+            return
+        spec = waiting[0][0]
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for paper in data.get('data', []):
-                authors = ', '.join([author['name'] for author in paper.get('authors', [])[:3]])
-                if len(paper.get('authors', [])) > 3:
-                    authors += ' et al.'
-                
-                results.append({
-                    'title': paper.get('title', ''),
-                    'url': paper.get('url', ''),
-                    'snippet': (paper.get('abstract', '')[:300] + '...') if paper.get('abstract') else '',
-                    'source_type': 'academic',
-                    'source_name': paper.get('venue', 'Semantic Scholar'),
-                    'published_date': paper.get('publicationDate', '') or str(paper.get('year', '')),
-                    'authors': authors
-                })
-            return results
+            if len(waiting) == 1:
+                self.stats['single_requests'] += 1
+                payloads = [json.loads(await http_client.request(spec.method, spec.url, headers=spec.headers,
+                                                                 data=spec.body))]
+            else:
+                self.stats['batches'] += 1
+                self.stats['batched_requests'] += len(waiting)
+                body = '[' + ','.join(item.body for item, _ in waiting) + ']'
+                payloads = json.loads(await http_client.request(spec.method, spec.url, headers=spec.headers,
+                                                                data=body))
+                if not isinstance(payloads, list) or len(payloads) != len(waiting):
+                    raise ValueError(f"batch of {len(waiting)} got a malformed response from {spec.url}")
         except Exception as e:
-            print(f"Semantic Scholar error: {e}")
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), payload in zip(waiting, payloads):
+            if not future.done():
+                future.set_result(payload)
+
+request_batcher = RequestBatcher()
+
+# Result cache: in-process LRU in front of a SQLite file shared by all workers.
+# Set RESEARCH_CACHE_DB to an empty string to keep the cache in memory only.
+RESEARCH_CACHE_DB = os.getenv('RESEARCH_CACHE_DB', os.path.join(tempfile.gettempdir(), 'research_cache.sqlite3'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '1000'))
+
+# Seconds a cached result stays fresh, by source type
+SOURCE_TYPE_TTL = {
+    'news': 15 * 60,
+    'web': 60 * 60,
+    'blog': 6 * 60 * 60,
+    'archive': 24 * 60 * 60,
+    'academic': 24 * 60 * 60,
+}
+DEFAULT_CACHE_TTL = 60 * 60
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace-insensitive form of a query for cache keys"""
+    return ' '.join(re.sub(r'[^\w\s:]', ' ', query.lower()).split())
+
+class ResultCache:
+    """Two-layer TTL cache: LRU dict per process, optional SQLite store across workers"""
+    
+    def __init__(self, db_path: str = RESEARCH_CACHE_DB, max_entries: int = CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+        if self.db_path:
+            try:
+                self._db().execute(
+                    'CREATE TABLE IF NOT EXISTS cache ('
+                    'namespace TEXT, key TEXT, value TEXT, expires_at REAL, '
+                    'PRIMARY KEY (namespace, key))'
+                )
+            except sqlite3.Error as e:
+                print(f"Cache disabled on disk: {e}")
+                self.db_path = ''
+    
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections are per thread; WAL lets workers read while one writes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    def _remember(self, full_key: tuple, value: Any, expires_at: float):
+        # Stored and returned by copy, like the disk layer: callers annotate the
+        # results they get back, which must not leak into later cache hits
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._memory[full_key] = (expires_at, value)
+            self._memory.move_to_end(full_key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def _recall(self, full_key: tuple) -> tuple:
+        """(found, value) from the in-memory layer"""
+        with self._lock:
+            entry = self._memory.get(full_key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._memory.move_to_end(full_key)
+                    self.stats['memory_hits'] += 1
+                    return True, copy.deepcopy(entry[1])
+                del self._memory[full_key]
+        return False, None
+    
+    def _disk_hit(self, full_key: tuple, row: Optional[tuple]) -> Optional[Any]:
+        if not row:
+            self.stats['misses'] += 1
+            return None
+        value, expires_at = row
+        self._remember(full_key, value, expires_at)
+        self.stats['disk_hits'] += 1
+        return value
+    
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Blocking lookup; coroutines use aget so SQLite never runs on the event loop"""
+        found, value = self._recall((namespace, key))
+        if found:
+            return value
+        return self._disk_hit((namespace, key), self.read_disk(namespace, key))
+    
+    def set(self, namespace: str, key: str, value: Any, ttl: float = DEFAULT_CACHE_TTL):
+        expires_at = time.time() + ttl
+        self._remember((namespace, key), value, expires_at)
+        self.write_disk(namespace, key, value, expires_at)
+    
+    async def aget(self, namespace: str, key: str) -> Optional[Any]:
+        """get() for coroutines: memory hits answer inline, SQLite reads (and their busy wait) run in a thread"""
+        found, value = self._recall((namespace, key))
+        if found:
+            return value
+        row = await asyncio.to_thread(self.read_disk, namespace, key) if self.db_path else None
+        return self._disk_hit((namespace, key), row)
+    
+    async def aset(self, namespace: str, key: str, value: Any, ttl: float = DEFAULT_CACHE_TTL):
+        expires_at = time.time() + ttl
+        self._remember((namespace, key), value, expires_at)
+        if self.db_path:
+            await asyncio.to_thread(self.write_disk, namespace, key, value, expires_at)
+    
+    def read_disk(self, namespace: str, key: str) -> Optional[tuple]:
+        """(value, expires_at) from the SQLite layer alone, or None"""
+        if not self.db_path:
+            return None
+        try:
+            row = self._db().execute(
+                'SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?',
+                (namespace, key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Cache read error: {e}")
+            return None
+        return (json.loads(row[0]), row[1]) if row else None
+    
+    def write_disk(self, namespace: str, key: str, value: Any, expires_at: float):
+        if not self.db_path:
+            return
+        try:
+            self._db().execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value), expires_at)
+            )
+        except sqlite3.Error as e:
+            print(f"Cache write error: {e}")
+    
+    def __len__(self) -> int:
+        return len(self._memory)
+    
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for full_key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[full_key]
+        if self.db_path:
+            try:
+                self._db().execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+            except sqlite3.Error as e:
+                print(f"Cache purge error: {e}")
+
+research_cache = ResultCache()
+
+# Local document index: every normalized result from a source is kept in a
+# SQLite FTS5 corpus, and sources with enough local matches for a query are
+# answered from it instead of going upstream. Set LOCAL_INDEX_DB='' to disable.
+LOCAL_INDEX_DB = os.getenv('LOCAL_INDEX_DB', os.path.join(tempfile.gettempdir(), 'document_index.sqlite3'))
+# How long indexed documents may stand in for a live search, by source type
+LOCAL_INDEX_MAX_AGE = {
+    'news': 24 * 60 * 60,
+    'blog': 7 * 24 * 60 * 60,
+    'web': 7 * 24 * 60 * 60,
+}
+LOCAL_INDEX_DEFAULT_MAX_AGE = 90 * 24 * 60 * 60
+
+class DocumentIndex:
+    """Full-text index over every result seen, queried per source before going upstream"""
+    
+    def __init__(self, db_path: str = LOCAL_INDEX_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        self.stats = {'local_answers': 0, 'upstream': 0, 'indexed': 0}
+        if self.db_path:
+            try:
+                db = self._db()
+                db.execute(
+                    'CREATE TABLE IF NOT EXISTS documents ('
+                    'id INTEGER PRIMARY KEY, source_name TEXT, url TEXT, source_type TEXT, '
+                    'title TEXT, snippet TEXT, data TEXT, indexed_at REAL, '
+                    'UNIQUE (source_name, url))'
+                )
+                db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5("
+                    "title, snippet, content='documents', content_rowid='id', tokenize='porter unicode61')"
+                )
+                # Keep the FTS table in step with the content table
+                db.execute(
+                    'CREATE TRIGGER IF NOT EXISTS documents_ai AFTER INSERT ON documents BEGIN '
+                    'INSERT INTO documents_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet); END'
+                )
+                db.execute(
+                    'CREATE TRIGGER IF NOT EXISTS documents_ad AFTER DELETE ON documents BEGIN '
+                    "INSERT INTO documents_fts (documents_fts, rowid, title, snippet) "
+                    "VALUES ('delete', old.id, old.title, old.snippet); END"
+                )
+            except sqlite3.Error as e:
+                print(f"Local index disabled: {e}")
+                self.db_path = ''
+    
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """All non-stopword query terms, quoted, so punctuation in the query cannot break FTS syntax"""
+        terms = [word for word in TOKEN_PATTERN.findall(query.lower()) if word not in STOPWORDS]
+        return ' '.join(f'"{term}"' for term in dict.fromkeys(terms))
+    
+    def add(self, source_name: str, results: List[Dict]):
+        """Index (or refresh) a source's normalized results"""
+        if not self.db_path or not results:
+            return
+        now = time.time()
+        by_url = {result['url']: result for result in results if result.get('url')}
+        try:
+            db = self._db()
+            db.execute('BEGIN')
+            # Delete then insert so the FTS delete trigger sees the old text
+            db.executemany('DELETE FROM documents WHERE source_name = ? AND url = ?',
+                           [(source_name, url) for url in by_url])
+            db.executemany(
+                'INSERT INTO documents (source_name, url, source_type, title, snippet, data, indexed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(source_name, url, result.get('source_type', 'web'), result.get('title') or '',
+                  result.get('snippet') or '', json.dumps(result), now)
+                 for url, result in by_url.items()]
+            )
+            db.execute('COMMIT')
+            self.stats['indexed'] += len(by_url)
+        except sqlite3.Error as e:
+            print(f"Local index write error: {e}")
+            try:
+                self._db().execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+    
+    def search(self, source_name: str, source_type: str, query: str, limit: int) -> List[Dict]:
+        """Best local matches from one source containing every query term, within the freshness window"""
+        expression = self.match_expression(query)
+        if not self.db_path or not expression:
+            return []
+        max_age = LOCAL_INDEX_MAX_AGE.get(source_type, LOCAL_INDEX_DEFAULT_MAX_AGE)
+        try:
+            rows = self._db().execute(
+                'SELECT documents.data FROM documents_fts JOIN documents ON documents.id = documents_fts.rowid '
+                'WHERE documents_fts MATCH ? AND documents.source_name = ? AND documents.indexed_at > ? '
+                'ORDER BY bm25(documents_fts, ?, ?) LIMIT ?',
+                (expression, source_name, time.time() - max_age,
+                 FIELD_WEIGHTS['title'], FIELD_WEIGHTS['snippet'], limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Local index read error: {e}")
             return []
+        return [json.loads(row[0]) for row in rows]
     
-    def search_arxiv(self, query: str, num_results: int = 10) -> List[Dict]:
-        """arXiv API"""
-        base_url = 'http://export.arxiv.org/api/query'
-        params = {
-            'search_query': f'all:{query}',
-            'start': 0,
-            'max_results': num_results,
-            'sortBy': 'relevance'
-        }
-        
+    def counts(self) -> Dict[str, int]:
+        if not self.db_path:
+            return {}
         try:
-            response = requests.get(base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
+            return dict(self._db().execute(
+                'SELECT source_name, COUNT(*) FROM documents GROUP BY source_name'
+            ).fetchall())
+        except sqlite3.Error as e:
+            print(f"Local index read error: {e}")
+            return {}
+
+document_index = DocumentIndex()
+
+# Per-source circuit breakers and adaptive timeouts. A source trips after
+# BREAKER_FAILURE_THRESHOLD consecutive failures (errors, timeouts or responses
+# slower than BREAKER_SLOW_SECONDS), is skipped for BREAKER_RESET_SECONDS, then
+# gets a single half-open probe. Timeouts follow each source's observed p95.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', '30'))
+BREAKER_SLOW_SECONDS = float(os.getenv('BREAKER_SLOW_SECONDS', '6'))
+ADAPTIVE_TIMEOUT_MIN = float(os.getenv('ADAPTIVE_TIMEOUT_MIN', '2'))
+ADAPTIVE_TIMEOUT_MULTIPLIER = 2.0
+LATENCY_WINDOW = 100
+LATENCY_MIN_SAMPLES = 10
+# Yield: fraction of a source's results that make the final ranked list (EWMA)
+YIELD_PRIOR = 0.5
+YIELD_SMOOTHING = 0.2
+YIELD_RELAX = 0.02
+
+class LatencyTracker:
+    """Rolling window of recent latencies for one source"""
+    
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+    
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+    
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self.samples) < LATENCY_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open probe -> closed"""
+    
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._probing = False
+    
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+    
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+    
+    def release_probe(self):
+        """The probe was cancelled before it could succeed or fail"""
+        self._probing = False
+    
+    def record_success(self):
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probing = False
+    
+    def record_failure(self):
+        self.failures += 1
+        if self._state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+class SourceHealth:
+    """Circuit breaker and latency tracker per source, shared across the worker"""
+    
+    def __init__(self):
+        self._breakers = {}
+        self._latency = {}
+        self._yield = {}
+    
+    def breaker(self, name: str) -> CircuitBreaker:
+        return self._breakers.setdefault(name, CircuitBreaker())
+    
+    def latency(self, name: str) -> LatencyTracker:
+        return self._latency.setdefault(name, LatencyTracker())
+    
+    def yield_for(self, name: str) -> float:
+        return self._yield.get(name, YIELD_PRIOR)
+    
+    def record_yield(self, name: str, returned: int, useful: int):
+        sample = useful / returned if returned else 0.0
+        self._yield[name] = (1 - YIELD_SMOOTHING) * self.yield_for(name) + YIELD_SMOOTHING * sample
+    
+    def relax_yield(self, name: str):
+        """Drift an unused source back toward the prior so it is eventually re-tried"""
+        self._yield[name] = self.yield_for(name) + YIELD_RELAX * (YIELD_PRIOR - self.yield_for(name))
+    
+    def timeout_for(self, name: str) -> float:
+        p95 = self.latency(name).percentile(95)
+        if p95 is None:
+            return HTTP_TIMEOUT_SECONDS
+        return min(HTTP_TIMEOUT_SECONDS, max(ADAPTIVE_TIMEOUT_MIN, p95 * ADAPTIVE_TIMEOUT_MULTIPLIER))
+    
+    def stats(self) -> Dict[str, Any]:
+        sources = {}
+        for name in sorted(set(self._breakers) | set(self._latency) | set(self._yield)):
+            breaker = self.breaker(name)
+            latency = self.latency(name)
+            sources[name] = {
+                'state': breaker.state,
+                'consecutive_failures': breaker.failures,
+                'p50_ms': round(latency.percentile(50) * 1000) if latency.percentile(50) is not None else None,
+                'p95_ms': round(latency.percentile(95) * 1000) if latency.percentile(95) is not None else None,
+                'timeout_s': round(self.timeout_for(name), 2),
+                'yield': round(self.yield_for(name), 3),
+                'samples': len(latency.samples)
             }
-            
-            results = []
-            for entry in root.findall('atom:entry', ns):
-                title = entry.find('atom:title', ns).text.strip().replace('\n', ' ')
-                summary = entry.find('atom:summary', ns).text.strip().replace('\n', ' ')
-                link = entry.find('atom:id', ns).text.strip()
-                published = entry.find('atom:published', ns).text.strip()[:10]
-                
-                authors = [author.find('atom:name', ns).text 
-                          for author in entry.findall('atom:author', ns)[:3]]
-                authors_str = ', '.join(authors)
-                if len(entry.findall('atom:author', ns)) > 3:
-                    authors_str += ' et al.'
-                
-                results.append({
-                    'title': title,
-                    'url': link,
-                    'snippet': summary[:300] + '...',
-                    'source_type': 'academic',
-                    'source_name': 'arXiv',
-                    'published_date': published,
-                    'authors': authors_str
-                })
-            return results
-        except Exception as e:
-            print(f"arXiv error: {e}")
-            return []
+        return sources
+
+source_health = SourceHealth()
+
+# Source scheduling: each request carries budgets, and sources are picked and
+# sized by their historical yield, latency and cost. Unset limits are unlimited.
+SEARCH_MAX_PAID_CALLS = int(os.getenv('SEARCH_MAX_PAID_CALLS')) if os.getenv('SEARCH_MAX_PAID_CALLS') else None
+SEARCH_MAX_LLM_TOKENS = int(os.getenv('SEARCH_MAX_LLM_TOKENS')) if os.getenv('SEARCH_MAX_LLM_TOKENS') else None
+MIN_PAID_YIELD = float(os.getenv('MIN_PAID_YIELD', '0.1'))
+HIGH_RELEVANCE = float(os.getenv('HIGH_RELEVANCE', '0.5'))
+# Per-source counts snap to a few sizes so the per-source cache keys stay stable
+PER_SOURCE_STEPS = (2, 3, 5, 8, 10, 15, 20)
+
+@dataclass
+class SearchBudget:
+    """Per-request limits: wall time in seconds, paid API calls and LLM tokens (None = unlimited)"""
+    max_latency: float = SEARCH_DEADLINE_SECONDS
+    max_paid_calls: Optional[int] = SEARCH_MAX_PAID_CALLS
+    max_llm_tokens: Optional[int] = SEARCH_MAX_LLM_TOKENS
+
+class SourceScheduler:
+    """Chooses which sources run for a request and how many results each is asked for"""
     
-    def search_pubmed(self, query: str, num_results: int = 10) -> List[Dict]:
-        """PubMed API"""
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        search_params = {
-            'db': 'pubmed',
-            'term': query,
-            'retmax': num_results,
-            'retmode': 'json'
-        }
+    def expected_latency(self, adapter: SourceAdapter) -> float:
+        p50 = source_health.latency(adapter.name).percentile(50)
+        return adapter.typical_latency if p50 is None else p50
+    
+    def plan(self, sources: List[SourceAdapter], num_results: int, budget: SearchBudget) -> List[tuple]:
+        """(adapter, result count) pairs in registry order"""
+        fast = [adapter for adapter in sources if self.expected_latency(adapter) <= budget.max_latency]
+        if sources and not fast:
+            # Nothing is expected to fit; the fastest source still gets its chance before the deadline
+            fast = [min(sources, key=self.expected_latency)]
+        
+        # Paid sources must earn their place: best yield per dollar first, up to the call budget
+        paid = sorted((adapter for adapter in fast if adapter.paid),
+                      key=lambda adapter: -source_health.yield_for(adapter.name) / adapter.cost_per_call)
+        paid = [adapter for adapter in paid if source_health.yield_for(adapter.name) >= MIN_PAID_YIELD]
+        if budget.max_paid_calls is not None:
+            paid = paid[:budget.max_paid_calls]
+        
+        chosen = [adapter for adapter in fast if not adapter.paid or adapter in paid]
+        for adapter in sources:
+            if adapter not in chosen:
+                source_health.relax_yield(adapter.name)
+        if not chosen:
+            return []
         
+        # Split the requested results in proportion to each source's yield
+        weights = [max(source_health.yield_for(adapter.name), 0.05) for adapter in chosen]
+        total = sum(weights)
+        return [(adapter, min(PER_SOURCE_STEPS, key=lambda step: abs(step - num_results * weight / total)))
+                for adapter, weight in zip(chosen, weights)]
+
+source_scheduler = SourceScheduler()
+
+@atexit.register
+def _close_http_client():
+    if event_loop._loop is not None and event_loop._pid == os.getpid():
         try:
-            search_response = requests.get(search_url, params=search_params, timeout=10)
-            search_response.raise_for_status()
-            search_data = search_response.json()
-            ids = search_data.get('esearchresult', {}).get('idlist', [])
-            
-            if not ids:
+            event_loop.run(http_client.close(), timeout=2)
+        except Exception:
+            pass
+
+@dataclass
+class ResearchResult:
+    title: str
+    url: str
+    snippet: str
+    source_type: str
+    relevance_score: float
+    published_date: str = ""
+    authors: str = ""
+    ai_summary: str = ""
+    relevance_explanation: str = ""
+    content_preview: str = ""
+    source_name: str = ""
+    sources: List[str] = field(default_factory=list)
+    published_ordinal: int = 0
+    result_id: str = ""
+
+# Published dates arrive in every shape (ISO timestamps, "2023 Jan 15", "3 days ago",
+# "Jan 15, 2023", free text). They are normalized once at ingestion to a day
+# ordinal (date.toordinal(), 0 = unknown) so recency and date ranges are integer math.
+MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+RELATIVE_UNIT_DAYS = {'second': 0, 'minute': 0, 'hour': 0, 'day': 1, 'week': 7, 'month': 30, 'year': 365}
+
+ISO_DATE = re.compile(r'^(\d{4})[-/](\d{1,2})(?:[-/](\d{1,2}))?')
+YEAR_MONTH_DAY = re.compile(r'^(\d{4})\s+([a-z]{3})[a-z]*\.?(?:\s+(\d{1,2}))?\b')
+MONTH_DAY_YEAR = re.compile(r'\b([a-z]{3})[a-z]*\.?\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})\b')
+DAY_MONTH_YEAR = re.compile(r'\b(\d{1,2})(?:st|nd|rd|th)?\s+([a-z]{3})[a-z]*\.?,?\s+(\d{4})\b')
+MONTH_YEAR = re.compile(r'\b([a-z]{3})[a-z]*\.?,?\s+(\d{4})\b')
+RELATIVE_DATE = re.compile(r'^(an?|\d+)\s+(second|minute|hour|day|week|month|year)s?\s+ago$')
+ANY_YEAR = re.compile(r'(?<!\d)(1[5-9]\d{2}|20\d{2})(?!\d)')
+
+def _ordinal(year: int, month: int = 1, day: int = 1) -> int:
+    try:
+        return date(year, month, day).toordinal()
+    except ValueError:
+        try:
+            return date(year, month, 1).toordinal()
+        except ValueError:
+            return 0
+
+@lru_cache(maxsize=10000)
+def _parse_date(text: str) -> tuple:
+    """('absolute', ordinal) or ('relative', days ago); memoized since formats recur heavily"""
+    text = text.strip().lower()
+    if not text:
+        return ('absolute', 0)
+    
+    match = RELATIVE_DATE.match(text)
+    if match:
+        count = 1 if match.group(1) in ('a', 'an') else int(match.group(1))
+        return ('relative', count * RELATIVE_UNIT_DAYS[match.group(2)])
+    if text in ('just now', 'today'):
+        return ('relative', 0)
+    if text == 'yesterday':
+        return ('relative', 1)
+    
+    # A pattern that matches but yields no valid date ("1999-2001" is not year 1999,
+    # month 20) falls through to the looser patterns below
+    match = ISO_DATE.match(text)
+    ordinal = match and _ordinal(int(match.group(1)), int(match.group(2)), int(match.group(3) or 1))
+    if ordinal:
+        return ('absolute', ordinal)
+    
+    match = YEAR_MONTH_DAY.match(text)
+    ordinal = (match and match.group(2) in MONTHS
+               and _ordinal(int(match.group(1)), MONTHS[match.group(2)], int(match.group(3) or 1)))
+    if ordinal:
+        return ('absolute', ordinal)
+    
+    match = MONTH_DAY_YEAR.search(text)
+    ordinal = (match and match.group(1) in MONTHS
+               and _ordinal(int(match.group(3)), MONTHS[match.group(1)], int(match.group(2))))
+    if ordinal:
+        return ('absolute', ordinal)
+    
+    match = DAY_MONTH_YEAR.search(text)
+    ordinal = (match and match.group(2) in MONTHS
+               and _ordinal(int(match.group(3)), MONTHS[match.group(2)], int(match.group(1))))
+    if ordinal:
+        return ('absolute', ordinal)
+    
+    match = MONTH_YEAR.search(text)
+    ordinal = match and match.group(1) in MONTHS and _ordinal(int(match.group(2)), MONTHS[match.group(1)])
+    if ordinal:
+        return ('absolute', ordinal)
+    
+    # Bare years, "[1920]", "c1920", "2015 Spring" and other free text
+    match = ANY_YEAR.search(text)
+    if match:
+        return ('absolute', _ordinal(int(match.group(1))))
+    return ('absolute', 0)
+
+def normalize_published_date(value: Any, today: Optional[date] = None) -> int:
+    """Day ordinal for any published_date shape we receive, or 0 if unknown"""
+    if not value:
+        return 0
+    kind, number = _parse_date(str(value)[:64])
+    if kind == 'relative':
+        return (today or date.today()).toordinal() - number
+    return number
+
+def normalize_results(results: List[Dict]) -> List[Dict]:
+    """Attach published_ordinal to freshly fetched results"""
+    today = date.today()
+    for result in results:
+        result['published_ordinal'] = normalize_published_date(result.get('published_date'), today)
+    return results
+
+class EnhancedSearchAgent:
+    """Multi-source search agent with expanded coverage"""
+    
+    def __init__(self):
+        self.keys = {name: os.getenv(name) for name in API_KEY_NAMES}
+    
+    def enabled_sources(self, category: Optional[str] = None) -> List[SourceAdapter]:
+        """Registry adapters usable with the configured keys, in registry order"""
+        return adapters_for(self.keys, category)
+    
+    async def fetch(self, spec: SourceRequest) -> Any:
+        if spec.batchable and REQUEST_BATCHING:
+            return await request_batcher.fetch(spec)
+        content = await http_client.request(spec.method, spec.url, params=spec.params, headers=spec.headers,
+                                            data=spec.body, hedge=spec.hedge)
+        return json.loads(content) if spec.response_format == 'json' else content
+    
+    async def asearch(self, adapter: SourceAdapter, query: str, num_results: int = 10) -> List[Dict]:
+        """Call one source's API and parse the response; raises on upstream failure"""
+        payload = await self.fetch(adapter.build_request(query, num_results, self.keys))
+        if adapter.follow_up:
+            spec = adapter.follow_up(payload, self.keys)
+            if spec is None:
                 return []
-            
-            fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-            fetch_params = {
-                'db': 'pubmed',
-                'id': ','.join(ids),
-                'retmode': 'json'
-            }
-            
-            fetch_response = requests.get(fetch_url, params=fetch_params, timeout=10)
-            fetch_response.raise_for_status()
-            fetch_data = fetch_response.json()
-            
-            results = []
-            for pmid in ids:
-                paper = fetch_data.get('result', {}).get(pmid, {})
-                
-                authors = []
-                for author in paper.get('authors', [])[:3]:
-                    authors.append(author.get('name', ''))
-                authors_str = ', '.join(authors)
-                if len(paper.get('authors', [])) > 3:
-                    authors_str += ' et al.'
-                
-                results.append({
-                    'title': paper.get('title', ''),
-                    'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                    'snippet': paper.get('source', ''),
-                    'source_type': 'academic',
-                    'source_name': 'PubMed',
-                    'published_date': paper.get('pubdate', ''),
-                    'authors': authors_str
-                })
-            return results
+            payload = await self.fetch(spec)
+        return adapter.parse(payload, num_results)
+    
+    def search(self, name: str, query: str, num_results: int = 10) -> List[Dict]:
+        """Blocking single-source search for callers outside the event loop"""
+        return event_loop.run(self.run_source(SOURCE_REGISTRY[name], query, num_results)) or []
+    
+    async def run_source(self, adapter: SourceAdapter, query: str, num_results: int) -> Optional[List[Dict]]:
+        """Call one source behind its circuit breaker with an adaptive timeout; None if it was unavailable"""
+        name = adapter.name
+        breaker = source_health.breaker(name)
+        if not breaker.allow():
+            print(f"⚡ {name} skipped (circuit open)")
+            return None
+        
+        latency = source_health.latency(name)
+        timeout = source_health.timeout_for(name)
+        started = time.monotonic()
+        try:
+            results = await asyncio.wait_for(self.asearch(adapter, query, num_results), timeout)
+        except asyncio.TimeoutError:
+            latency.record(timeout)
+            breaker.record_failure()
+            print(f"{name} timed out after {timeout:.1f}s")
+            return None
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
         except Exception as e:
-            print(f"PubMed error: {e}")
-            return []
+            breaker.record_failure()
+            print(f"{name} error: {e}")
+            return None
+        
+        elapsed = time.monotonic() - started
+        normalize_results(results)
+        for result in results:
+            result['source_key'] = name
+        # SQLite (and its lock, shared with other workers) stays off the event loop
+        await asyncio.to_thread(document_index.add, name, results)
+        latency.record(elapsed)
+        if elapsed > BREAKER_SLOW_SECONDS:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return results
     
-    def search_general_web(self, query: str, num_results: int = 10) -> List[Dict]:
-        """General web search via Serper or Brave"""
-        if self.serper_api_key:
-            url = "https://google.serper.dev/search"
-            payload = json.dumps({"q": query, "num": num_results})
-            headers = {
-                'X-API-KEY': self.serper_api_key,
-                'Content-Type': 'application/json'
-            }
-            
-            try:
-                response = requests.post(url, headers=headers, data=payload, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                results = []
-                for item in data.get('organic', [])[:num_results]:
-                    results.append({
-                        'title': item.get('title', ''),
-                        'url': item.get('link', ''),
-                        'snippet': item.get('snippet', ''),
-                        'source_type': 'web',
-                        'source_name': 'Web',
-                        'published_date': item.get('date', '')
-                    })
-                return results
-            except Exception as e:
-                print(f"General web search error: {e}")
-                return []
+    async def cached_search(self, adapter: SourceAdapter, query: str, num_results: int) -> Optional[List[Dict]]:
+        """Run one source, serving repeat queries from the result cache or the local index; None if unavailable"""
+        name = adapter.name
+        key = f"{normalize_query(query)}|{num_results}"
+        cached = await research_cache.aget(f"source:{name}", key)
+        if cached is not None:
+            return cached
         
-        elif self.brave_api_key:
-            url = "https://api.search.brave.com/res/v1/web/search"
-            headers = {
-                "Accept": "application/json",
-                "X-Subscription-Token": self.brave_api_key
-            }
-            params = {"q": query, "count": num_results}
-            
-            try:
-                response = requests.get(url, headers=headers, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                results = []
-                for item in data.get('web', {}).get('results', [])[:num_results]:
-                    results.append({
-                        'title': item.get('title', ''),
-                        'url': item.get('url', ''),
-                        'snippet': item.get('description', ''),
-                        'source_type': 'web',
-                        'source_name': 'Web',
-                        'published_date': item.get('age', '')
-                    })
-                return results
-            except Exception as e:
-                print(f"Brave search error: {e}")
-                return []
+        # Sources with full local coverage for this query skip the network
+        local = await asyncio.to_thread(document_index.search, name, adapter.category, query, num_results)
+        if len(local) >= num_results:
+            document_index.stats['local_answers'] += 1
+            print(f"📚 {name} answered from local index")
+            return local
         
-        return []
+        document_index.stats['upstream'] += 1
+        results = await self.run_source(adapter, query, num_results)
+        # Empty lists are not cached either: an upstream outage can look like an empty answer
+        if results:
+            await research_cache.aset(f"source:{name}", key, results,
+                                      SOURCE_TYPE_TTL.get(adapter.category, DEFAULT_CACHE_TTL))
+        return results
     
-    def search_all_sources(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Search across all available sources"""
-        all_results = []
-        per_source = max(2, num_results // 8)
+    async def iter_source_results(self, query: str, num_results: int = 10,
+                                  deadline: Optional[float] = None, category: Optional[str] = None,
+                                  budget: Optional[SearchBudget] = None, report: Optional[Dict] = None):
+        """Run the scheduled sources (optionally one category) concurrently, yielding (source, results) as each finishes.
         
-        print(f"🔍 Searching across multiple sources for: {query}")
+        Sources still running when the deadline expires are cancelled; whatever
+        finished in time is returned as a partial result set. report, if given,
+        receives the 'planned' source names and the 'completed' ones, i.e. those
+        that answered rather than failing, timing out or being cut off.
+        """
+        budget = budget or SearchBudget()
+        deadline = min(SEARCH_DEADLINE_SECONDS if deadline is None else deadline, budget.max_latency)
+        plan = source_scheduler.plan(self.enabled_sources(category), num_results, budget)
         
-        # Academic sources
-        print("📚 Searching academic sources...")
-        all_results.extend(self.search_semantic_scholar(query, per_source))
-        all_results.extend(self.search_arxiv(query, per_source))
-        all_results.extend(self.search_pubmed(query, per_source))
-        all_results.extend(self.search_google_scholar(query, per_source))
+        loop = asyncio.get_running_loop()
+        tasks = {
+            asyncio.ensure_future(self.cached_search(adapter, query, count)): adapter.name
+            for adapter, count in plan
+        }
+        report = {} if report is None else report
+        report['planned'] = [adapter.name for adapter, _ in plan]
+        report['completed'] = []
+        pending = set(tasks)
+        expires_at = loop.time() + deadline
         
-        # News sources
-        print("📰 Searching news sources...")
-        all_results.extend(self.search_google_news(query, per_source))
-        all_results.extend(self.search_newsapi(query, per_source))
+        try:
+            while pending:
+                remaining = expires_at - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = tasks[task]
+                    try:
+                        results = task.result()
+                    except Exception as e:
+                        print(f"{name} error: {e}")
+                        results = None
+                    if results is not None:
+                        report['completed'].append(name)
+                    yield name, results or []
+            
+            if pending:
+                print(f"⏱️ Deadline of {deadline}s reached, skipping: "
+                      f"{', '.join(tasks[task] for task in pending)}")
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def asearch_all_sources(self, query: str, num_results: int = 10,
+                                  deadline: Optional[float] = None,
+                                  on_results: Optional[Callable[[str, List[Dict]], Awaitable[None]]] = None,
+                                  category: Optional[str] = None, budget: Optional[SearchBudget] = None,
+                                  stop_when: Optional[Callable[[List[Dict]], Awaitable[bool]]] = None,
+                                  report: Optional[Dict] = None) -> List[Dict]:
+        """Search across the scheduled sources (or one category) concurrently.
         
-        # Blog platforms
-        print("📝 Searching blogs...")
-        all_results.extend(self.search_substack(query, per_source))
-        all_results.extend(self.search_medium(query, per_source))
+        on_results, if given, is awaited with (source, results) as each source finishes.
+        stop_when, if given, is awaited after each source; once it returns True the
+        sources still running are cancelled. report is filled in as for iter_source_results.
+        """
+        print(f"🔍 Searching across {category or 'multiple'} sources for: {query}")
+        started = time.monotonic()
         
-        # Archives
-        print("🗄️ Searching archives...")
-        all_results.extend(self.search_internet_archive(query, per_source))
+        # Keep the registry order in the output regardless of finish order
+        order = [adapter.name for adapter in self.enabled_sources(category)]
+        by_source = {}
+        collected = []
+        async with contextlib.aclosing(self.iter_source_results(query, num_results, deadline,
+                                                                category, budget, report)) as source_results:
+            async for name, results in source_results:
+                print(f"  ✓ {name}: {len(results)} results ({time.monotonic() - started:.1f}s)")
+                by_source[name] = results
+                collected.extend(results)
+                if on_results:
+                    await on_results(name, results)
+                if stop_when and await stop_when(collected):
+                    print(f"🎯 Enough high-relevance results after {len(by_source)} sources, stopping early")
+                    break
         
-        # General web
-        print("🌐 Searching general web...")
-        all_results.extend(self.search_general_web(query, per_source))
+        all_results = []
+        for name in order:
+            all_results.extend(by_source.get(name, []))
         
-        print(f"✅ Found {len(all_results)} total results")
+        print(f"✅ Found {len(all_results)} total results from {len(by_source)}/{len(order)} sources "
+              f"in {time.monotonic() - started:.1f}s")
         return all_results
+    
+    def search_all_sources(self, query: str, num_results: int = 10, deadline: Optional[float] = None,
+                           category: Optional[str] = None, budget: Optional[SearchBudget] = None) -> List[Dict]:
+        return event_loop.run(self.asearch_all_sources(query, num_results, deadline,
+                                                       category=category, budget=budget))
+
+# Batched enrichment: many results share one prompt, sized to a token budget
+GEMINI_BATCH_TOKEN_BUDGET = int(os.getenv('GEMINI_BATCH_TOKEN_BUDGET', '8000'))
+GEMINI_MAX_BATCH_SIZE = int(os.getenv('GEMINI_MAX_BATCH_SIZE', '15'))
+BATCH_OUTPUT_TOKENS_PER_ITEM = 150
+BATCH_SNIPPET_CHARS = 600
+BATCH_CONTENT_CHARS = 2000
+
+# Document summaries depend only on the document, so they are kept far longer
+# than query results and reused across queries; relevance is always fresh
+SUMMARY_CACHE_TTL = int(os.getenv('SUMMARY_CACHE_TTL', str(30 * 24 * 60 * 60)))
+
+RELEVANCE_UNAVAILABLE = "AI relevance assessment unavailable"
+
+def summary_cache_key(result: Dict) -> str:
+    """Content address for a document: URL plus a hash of the snippet it was summarized from"""
+    snippet_hash = hashlib.sha256(result.get('snippet', '').encode('utf-8')).hexdigest()
+    return hashlib.sha256(f"{result.get('url', '')}\n{snippet_hash}".encode('utf-8')).hexdigest()
+
+# Gemini worker pool: bounded concurrency under the project's quota. GEMINI_RPM and
+# GEMINI_TPM are the account-wide limits; every gunicorn worker gets an equal share,
+# so WEB_CONCURRENCY must match the worker count (the Procfile reads it too)
+GEMINI_MAX_CONCURRENCY = int(os.getenv('GEMINI_MAX_CONCURRENCY', '4'))
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', '60'))
+GEMINI_TPM = int(os.getenv('GEMINI_TPM', '500000'))
+WEB_CONCURRENCY = max(1, int(os.getenv('WEB_CONCURRENCY', '2')))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', '3'))
+GEMINI_BACKOFF_SECONDS = 2.0
+GEMINI_MAX_BACKOFF_SECONDS = 60.0
+
+BATCH_PROMPT_TEMPLATE = """Analyze each of the {count} search results below in relation to the query: "{query}"
+
+{items}
+TASK:
+For EVERY result above:
+1. Write a concise 2-3 sentence summary of what the article is about
+   (for results that have a "Known summary", write exactly "SUMMARY: KNOWN" instead)
+2. Explain in 1-2 sentences why the article is relevant (or not) to the query "{query}"
+
+FORMAT YOUR RESPONSE EXACTLY AS ONE BLOCK PER RESULT, IN ORDER, WITH NOTHING ELSE:
+[1]
+SUMMARY: [summary of result 1]
+RELEVANCE: [relevance explanation for result 1]
+[2]
+SUMMARY: [summary of result 2]
+RELEVANCE: [relevance explanation for result 2]
+
+Be specific, analytical, and honest about relevance."""
+
+class LLMRateLimiter:
+    """Token-bucket limiter for LLM calls in requests/minute and tokens/minute.
+    
+    Buckets refill continuously, so short bursts up to the per-minute quota go
+    out at once. A 429 from the API puts every caller into a shared cooldown
+    that doubles on repeated 429s and resets after a successful call.
+    """
+    
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+        self._backoff = GEMINI_BACKOFF_SECONDS
+        self._lock = asyncio.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+        self._updated = now
+    
+    async def acquire(self, tokens: int):
+        # Oversized prompts would never fit the bucket; let them drain it instead
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._cooldown_until:
+                    await asyncio.sleep(self._cooldown_until - now)
+                    continue
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = max((1 - self._requests) * 60 / self.rpm,
+                           (tokens - self._tokens) * 60 / self.tpm)
+                await asyncio.sleep(wait)
+    
+    def record_rate_limit(self) -> float:
+        """Start (or extend) the shared cooldown after a 429; returns the delay"""
+        delay = self._backoff
+        self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        self._backoff = min(self._backoff * 2, GEMINI_MAX_BACKOFF_SECONDS)
+        return delay
+    
+    def record_success(self):
+        self._backoff = GEMINI_BACKOFF_SECONDS
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """True for Gemini quota errors (HTTP 429 / ResourceExhausted)"""
+    return (getattr(error, 'code', None) == 429
+            or type(error).__name__ == 'ResourceExhausted'
+            or '429' in str(error))
+
+# Shared by every GeminiRAGAgent in this worker process; agents are also created
+# per request, so neither the quota nor the concurrency cap may live on the instance
+gemini_limiter = LLMRateLimiter(GEMINI_RPM / WEB_CONCURRENCY, GEMINI_TPM / WEB_CONCURRENCY)
+gemini_slots = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
 
 class GeminiRAGAgent:
     """RAG Agent using Google Gemini Flash 2.5"""
     
     def __init__(self):
         self.model = model if GEMINI_API_KEY else None
+        self.limiter = gemini_limiter
+        self.semaphore = gemini_slots
     
-    def generate_summary_and_relevance(self, result: Dict, query: str) -> tuple:
+    async def generate(self, prompt: str, output_tokens: int = BATCH_OUTPUT_TOKENS_PER_ITEM) -> str:
+        """Rate-limited Gemini call with adaptive backoff on 429s"""
+        tokens = self.estimate_tokens(prompt) + output_tokens
+        
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            await self.limiter.acquire(tokens)
+            async with self.semaphore:
+                try:
+                    response = await self.model.generate_content_async(prompt)
+                    self.limiter.record_success()
+                    return response.text
+                except Exception as e:
+                    if not is_rate_limit_error(e) or attempt == GEMINI_MAX_RETRIES:
+                        raise
+                    delay = self.limiter.record_rate_limit()
+                    print(f"⏳ Gemini rate limited, backing off {delay:.1f}s")
+    
+    async def cached_summary(self, result: Dict) -> Optional[str]:
+        return await research_cache.aget('summary', summary_cache_key(result))
+    
+    async def remember_summary(self, result: Dict, summary: str):
+        await research_cache.aset('summary', summary_cache_key(result), summary, SUMMARY_CACHE_TTL)
+    
+    async def agenerate_summary_and_relevance(self, result: Dict, query: str) -> tuple:
         """Generate AI summary and relevance explanation using Gemini"""
         if not self.model:
             return ("Summary unavailable - Gemini API key not configured", 
                    "Relevance assessment unavailable")
         
+        known_summary = await self.cached_summary(result)
+        
         try:
+            if known_summary:
+                prompt = f"""Assess this search result in relation to the query: "{query}"
+
+ARTICLE DETAILS:
+Title: {result['title']}
+Source: {result.get('source_name', 'Unknown')}
+Summary: {known_summary}
+Type: {result['source_type']}
+
+TASK:
+Explain in 1-2 sentences why this article is relevant (or not) to the query "{query}"
+
+FORMAT YOUR RESPONSE AS:
+RELEVANCE: [your relevance explanation here]
+
+Be specific, analytical, and honest about relevance."""
+
+                text = (await self.generate(prompt)).strip()
+                relevance = text.split("RELEVANCE:", 1)[-1].strip()
+                return (known_summary, relevance[:300])
+            
             prompt = f"""Analyze this search result in relation to the query: "{query}"
 
 ARTICLE DETAILS:
 Title: {result['title']}
 Source: {result.get('source_name', 'Unknown')}
-Snippet: {result['snippet']}
+{self.document_text(result)}
 Type: {result['source_type']}
 
 TASK:
@@ -532,8 +1659,7 @@ RELEVANCE: [your relevance explanation here]
 
 Be specific, analytical, and honest about relevance."""
 
-            response = self.model.generate_content(prompt)
-            text = response.text.strip()
+            text = (await self.generate(prompt)).strip()
             
             # Parse response
             summary = ""
@@ -549,112 +1675,643 @@ Be specific, analytical, and honest about relevance."""
                 summary = ' '.join(lines[:3]).strip()
                 relevance = ' '.join(lines[3:]).strip()
             
+            if summary:
+                await self.remember_summary(result, summary[:500])
             return (summary[:500], relevance[:300])
         
         except Exception as e:
-            print(f"Gemini error: {e}")
-            return (f"Summary: {result['snippet'][:200]}...", 
-                   "AI relevance assessment unavailable")
+            print(f"Gemini error: {e}")
+            return (known_summary or f"Summary: {result['snippet'][:200]}...", 
+                   RELEVANCE_UNAVAILABLE)
+    
+    def generate_summary_and_relevance(self, result: Dict, query: str) -> tuple:
+        return event_loop.run(self.agenerate_summary_and_relevance(result, query))
+    
+    async def abatch_process_results(self, results: List[Dict], query: str,
+                                     on_result: Optional[Callable[[Dict], None]] = None,
+                                     max_tokens: Optional[int] = None) -> List[Dict]:
+        """Process multiple results with AI summaries, running batches concurrently.
+        
+        on_result, if given, is called with each result as soon as its batch completes.
+        max_tokens caps the estimated prompt + output tokens; later batches are skipped.
+        """
+        print(f"🤖 Generating AI summaries with Gemini Flash 2.5...")
+        
+        batches = self.plan_batches(results, query)
+        if max_tokens is not None:
+            affordable = []
+            spent = 0
+            for batch in batches:
+                spent += self.batch_cost(batch, query)
+                if spent > max_tokens:
+                    break
+                affordable.append(batch)
+            if len(affordable) < len(batches):
+                print(f"💰 LLM token budget of {max_tokens} covers {len(affordable)}/{len(batches)} batches")
+            batches = affordable
+        print(f"Processing {sum(len(batch) for batch in batches)} results in {len(batches)} batches...")
+        await asyncio.gather(*(self.process_batch(batch, query, on_result) for batch in batches))
+        return results
+    
+    def batch_process_results(self, results: List[Dict], query: str) -> List[Dict]:
+        return event_loop.run(self.abatch_process_results(results, query))
+    
+    async def process_batch(self, batch: List[Dict], query: str,
+                            on_result: Optional[Callable[[Dict], None]] = None):
+        known = {}
+        if self.model:
+            for index, result in enumerate(batch):
+                summary = await self.cached_summary(result)
+                if summary:
+                    known[index] = summary
+        
+        parsed = await self.generate_batch(batch, query, known)
+        if parsed is None:
+            # The call itself failed, e.g. still rate limited after retries; one call per
+            # item would only multiply the load, so the whole batch is marked unavailable
+            parsed = {i: (known.get(i) or f"Summary: {result['snippet'][:200]}...", RELEVANCE_UNAVAILABLE)
+                      for i, result in enumerate(batch)}
+        else:
+            if self.model:
+                for index, (summary, _) in parsed.items():
+                    if index not in known:
+                        await self.remember_summary(batch[index], summary)
+            
+            # The model answered but skipped or garbled these items; fall back to single calls
+            missing = [i for i in range(len(batch)) if i not in parsed]
+            fallbacks = await asyncio.gather(*(self.agenerate_summary_and_relevance(batch[i], query)
+                                               for i in missing))
+            parsed.update(zip(missing, fallbacks))
+        
+        for index, result in enumerate(batch):
+            result['ai_summary'], result['relevance_explanation'] = parsed[index]
+            if on_result:
+                on_result(result)
+    
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count (~4 characters per token for English text)"""
+        return len(text) // 4 + 1
+    
+    def batch_cost(self, batch: List[Dict], query: str) -> int:
+        """Estimated prompt + output tokens for one batch call"""
+        return (self.estimate_tokens(BATCH_PROMPT_TEMPLATE) + 2 * self.estimate_tokens(query)
+                + sum(self.estimate_tokens(self.format_batch_item(0, result)) + BATCH_OUTPUT_TOKENS_PER_ITEM
+                      for result in batch))
+    
+    def plan_batches(self, results: List[Dict], query: str) -> List[List[Dict]]:
+        """Split results into batches that fit the prompt + output token budget"""
+        budget = GEMINI_BATCH_TOKEN_BUDGET - self.estimate_tokens(BATCH_PROMPT_TEMPLATE) - 2 * self.estimate_tokens(query)
+        
+        batches = []
+        current = []
+        used = 0
+        for result in results:
+            cost = self.estimate_tokens(self.format_batch_item(0, result)) + BATCH_OUTPUT_TOKENS_PER_ITEM
+            if current and (used + cost > budget or len(current) >= GEMINI_MAX_BATCH_SIZE):
+                batches.append(current)
+                current = []
+                used = 0
+            current.append(result)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+    
+    @staticmethod
+    def document_text(result: Dict) -> str:
+        """Extracted page text when the content stage fetched it, otherwise the search snippet"""
+        if result.get('content'):
+            return f"Content: {result['content'][:BATCH_CONTENT_CHARS]}"
+        return f"Snippet: {result['snippet']}"
+    
+    @staticmethod
+    def format_batch_item(number: int, result: Dict, known_summary: Optional[str] = None) -> str:
+        if known_summary:
+            # Summary is cached, so the model only needs it as context for relevance
+            body = f"Known summary: {known_summary}\n"
+        elif result.get('content'):
+            body = f"Content: {result['content'][:BATCH_CONTENT_CHARS]}\n"
+        else:
+            body = f"Snippet: {result['snippet'][:BATCH_SNIPPET_CHARS]}\n"
+        return (f"[{number}]\n"
+                f"Title: {result['title']}\n"
+                f"Source: {result.get('source_name', 'Unknown')}\n"
+                f"Type: {result['source_type']}\n"
+                + body)
+    
+    async def generate_batch(self, batch: List[Dict], query: str,
+                             known: Optional[Dict[int, str]] = None) -> Optional[Dict[int, tuple]]:
+        """One Gemini call for a whole batch; returns {index in batch: (summary, relevance)}, or None if the call failed"""
+        if not self.model:
+            return {i: ("Summary unavailable - Gemini API key not configured",
+                        "Relevance assessment unavailable") for i in range(len(batch))}
+        
+        known = known or {}
+        items = '\n'.join(self.format_batch_item(i + 1, result, known.get(i)) for i, result in enumerate(batch))
+        prompt = BATCH_PROMPT_TEMPLATE.format(query=query, count=len(batch), items=items)
+        output_tokens = sum(BATCH_OUTPUT_TOKENS_PER_ITEM // (3 if i in known else 1) for i in range(len(batch)))
+        
+        try:
+            text = await self.generate(prompt, output_tokens)
+            return self.parse_batch_response(text, len(batch), known)
+        except Exception as e:
+            print(f"Gemini batch error: {e}")
+            return None
+    
+    @staticmethod
+    def parse_batch_response(text: str, count: int, known: Optional[Dict[int, str]] = None) -> Dict[int, tuple]:
+        """Parse '[n] SUMMARY: ... RELEVANCE: ...' blocks back into per-item tuples"""
+        known = known or {}
+        parsed = {}
+        blocks = re.split(r'^\s*\[(\d+)\]\s*$', text.strip(), flags=re.MULTILINE)
+        # re.split with a group yields [preamble, number, body, number, body, ...]
+        for number, body in zip(blocks[1::2], blocks[2::2]):
+            index = int(number) - 1
+            if not 0 <= index < count or "RELEVANCE:" not in body:
+                continue
+            summary, relevance = body.split("RELEVANCE:", 1)
+            relevance = relevance.strip()
+            if index in known:
+                parsed[index] = (known[index], relevance[:300])
+                continue
+            if "SUMMARY:" not in summary:
+                continue
+            summary = summary.replace("SUMMARY:", "").strip()
+            if summary:
+                parsed[index] = (summary[:500], relevance[:300])
+        return parsed
+
+# Cross-source duplicate detection
+TITLE_SIMILARITY_THRESHOLD = float(os.getenv('TITLE_SIMILARITY_THRESHOLD', '0.85'))
+TITLE_BLOCKING_KEYS = 3
+MAX_BLOCK_SIZE = 50
+TRACKING_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+                   'ref', 'fbclid', 'gclid', 'source', 'via'}
+
+DOI_PATTERN = re.compile(r'\b(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+ARXIV_PATTERN = re.compile(r'arxiv\.org/(?:abs|pdf)/([a-z\-]+/\d{7}|\d{4}\.\d{4,5})', re.IGNORECASE)
+PMID_PATTERN = re.compile(r'(?:pubmed\.ncbi\.nlm\.nih\.gov/|ncbi\.nlm\.nih\.gov/pubmed/)(\d+)', re.IGNORECASE)
+
+class DeduplicationAgent:
+    """Merge the same work returned by several sources into one record.
+    
+    Records match on a shared DOI, arXiv id or PMID, on canonical URL, or on
+    near-identical titles. Every key is looked up in a hash index, and fuzzy
+    title comparison only runs within small blocks of titles sharing a
+    distinctive word, so the pass stays close to linear in the result count.
+    """
+    
+    @staticmethod
+    def canonical_url(url: str) -> str:
+        parts = urlsplit(url.strip())
+        host = (parts.hostname or '').lower()
+        if host.startswith('www.'):
+            host = host[4:]
+        query = '&'.join(sorted(pair for pair in parts.query.split('&')
+                                if pair and pair.split('=')[0].lower() not in TRACKING_PARAMS))
+        path = parts.path.rstrip('/')
+        return f"{host}{path}" + (f"?{query}" if query else '')
+    
+    @staticmethod
+    def title_tokens(title: str) -> List[str]:
+        return re.findall(r'[a-z0-9]+', title.lower())
+    
+    def identifiers(self, result: Dict) -> List[str]:
+        """Hashable match keys: persistent ids, canonical URL and exact normalized title"""
+        keys = []
+        text = result.get('url', '')
+        # Blogs and news often cite a DOI without being that paper
+        if result.get('source_type') == 'academic':
+            text += f" {result.get('snippet', '')}"
+        for doi in DOI_PATTERN.findall(text):
+            keys.append(f"doi:{doi.lower().rstrip('.,;)')}")
+        for arxiv_id in ARXIV_PATTERN.findall(result.get('url', '')):
+            keys.append(f"arxiv:{arxiv_id.lower()}")
+        for pmid in PMID_PATTERN.findall(result.get('url', '')):
+            keys.append(f"pmid:{pmid}")
+        if result.get('url'):
+            keys.append(f"url:{self.canonical_url(result['url'])}")
+        tokens = self.title_tokens(result.get('title', ''))
+        if len(tokens) >= 3:
+            keys.append(f"title:{' '.join(tokens)}")
+        return keys
+    
+    @staticmethod
+    def richness(result: Dict) -> float:
+        filled = sum(1 for key in ('title', 'url', 'snippet', 'published_date', 'authors') if result.get(key))
+        academic = 2 if result.get('source_type') == 'academic' else 0
+        return academic + filled + min(len(result.get('snippet', '')), 600) / 600
+    
+    def fuse(self, group: List[Dict]) -> Dict:
+        """Combine duplicates, starting from the richest record and filling its gaps"""
+        group = sorted(group, key=self.richness, reverse=True)
+        fused = dict(group[0])
+        
+        for other in group[1:]:
+            for key in ('authors', 'ai_summary', 'relevance_explanation'):
+                if not fused.get(key) and other.get(key):
+                    fused[key] = other[key]
+            if len(other.get('snippet', '')) > len(fused.get('snippet', '')):
+                fused['snippet'] = other['snippet']
+            # Prefer the most specific date ('2023-05-14' over '2023')
+            if len(str(other.get('published_date', ''))) > len(str(fused.get('published_date', ''))):
+                fused['published_date'] = other['published_date']
+                fused['published_ordinal'] = other.get('published_ordinal', 0)
+            if other.get('source_type') == 'academic':
+                fused['source_type'] = 'academic'
+        
+        sources = []
+        for record in group:
+            for name in record.get('sources') or [record.get('source_name', '')]:
+                if name and name not in sources:
+                    sources.append(name)
+        fused['sources'] = sources
+        fused['source_keys'] = list(dict.fromkeys(
+            key for record in group for key in record.get('source_keys') or [record.get('source_key')] if key))
+        return fused
+    
+    def deduplicate(self, results: List[Dict]) -> List[Dict]:
+        parent = list(range(len(results)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        def union(i: int, j: int):
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        # Exact keys: DOI, arXiv id, PMID, canonical URL, normalized title
+        seen = {}
+        for i, result in enumerate(results):
+            for key in self.identifiers(result):
+                if key in seen:
+                    union(i, seen[key])
+                else:
+                    seen[key] = i
+        
+        # Fuzzy titles: compare only within blocks sharing one of the longest words
+        token_sets = [set(self.title_tokens(result.get('title', ''))) for result in results]
+        blocks = {}
+        for i, tokens in enumerate(token_sets):
+            if len(tokens) < 3:
+                continue
+            for token in sorted(tokens, key=lambda t: (-len(t), t))[:TITLE_BLOCKING_KEYS]:
+                blocks.setdefault(token, []).append(i)
+        
+        for members in blocks.values():
+            if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+                continue
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    i, j = members[a], members[b]
+                    if find(i) == find(j):
+                        continue
+                    overlap = len(token_sets[i] & token_sets[j]) / len(token_sets[i] | token_sets[j])
+                    if overlap >= TITLE_SIMILARITY_THRESHOLD:
+                        union(i, j)
+        
+        groups = {}
+        for i in range(len(results)):
+            groups.setdefault(find(i), []).append(results[i])
+        
+        # Groups are keyed by their earliest member, so source order is preserved
+        deduplicated = [group[0] if len(group) == 1 else self.fuse(group)
+                        for _, group in sorted(groups.items())]
+        if len(deduplicated) < len(results):
+            print(f"🔗 Merged {len(results) - len(deduplicated)} duplicate results")
+        return deduplicated
+
+# Lexical ranking: BM25 over title and snippet, computed per result pool
+BM25_K1 = 1.2
+BM25_B = 0.75
+FIELD_WEIGHTS = {'title': 0.6, 'snippet': 0.4}
+PHRASE_BONUS = 0.1
+STOPWORDS = frozenset("""a an and are as at be by for from has have how in into is it its of on or
+that the their this to was were what when where which who why will with about vs via""".split())
+
+@lru_cache(maxsize=50000)
+def stem(word: str) -> str:
+    """Light suffix stripping so 'networks'/'network' and 'learning'/'learned' match"""
+    for suffix, replacement in (('ies', 'y'), ('sses', 'ss'), ('ing', ''), ('ed', ''), ('es', ''), ('s', '')):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith('ss'):
+            return word[:-len(suffix)] + replacement
+    return word
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+@lru_cache(maxsize=65536)
+def tokenize(text: str) -> tuple:
+    """Stemmed, stopword-free tokens; memoized because pools are re-ranked as sources arrive"""
+    return tuple(stem(word) for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS)
+
+class BM25Index:
+    """Per-query BM25 statistics over a pool of results.
+    
+    Every document is tokenized once and the pool is turned into posting arrays:
+    per field, one (document, term id, term frequency) entry per distinct term,
+    plus one (document, bigram) entry per adjacent token pair. Scoring a query is
+    then array operations only, with no Python loop over documents or terms.
+    Scores are normalized to [0, 1]: each query term contributes its IDF-weighted,
+    length-normalized saturation divided by its ceiling of BM25_K1 + 1, so repeated
+    terms still count, and the sum is divided by the total IDF of the query.
+    """
+    
+    def __init__(self, results: List[Dict]):
+        self.size = len(results)
+        self.fields = {}
+        self.average_length = {}
+        
+        tokens = {name: [tokenize(result.get(name) or '') for result in results] for name in FIELD_WEIGHTS}
+        # Set union and map() keep the per-token work in C
+        self.vocabulary = {term: i for i, term in enumerate(set().union(*chain.from_iterable(tokens.values())))}
+        ids = {name: np.fromiter(map(self.vocabulary.__getitem__, chain.from_iterable(docs)), dtype=np.int64)
+               for name, docs in tokens.items()}
+        width = max(len(self.vocabulary), 1)
+        
+        distinct = []
+        bigram_docs = []
+        bigram_keys = []
+        for name, docs in tokens.items():
+            lengths = np.fromiter(map(len, docs), dtype=np.int64, count=self.size)
+            owner = np.repeat(np.arange(self.size, dtype=np.int64), lengths)
+            # Distinct (document, term) pairs with their counts
+            pairs, tf = self.distinct(owner * width + ids[name])
+            self.fields[name] = {
+                'docs': pairs // width,
+                'terms': pairs % width,
+                'tf': tf.astype(float),
+                'lengths': lengths.astype(float)
+            }
+            self.average_length[name] = float(lengths.mean()) if self.size else 0.0
+            distinct.append(pairs)
+            # Adjacent token pairs that stay inside one document
+            same_doc = owner[1:] == owner[:-1]
+            bigram_docs.append(owner[1:][same_doc])
+            bigram_keys.append((ids[name][:-1] * width + ids[name][1:])[same_doc])
+        
+        self.width = width
+        self.document_frequency = np.bincount(self.distinct(np.concatenate(distinct))[0] % width, minlength=width)
+        self.bigram_docs = np.concatenate(bigram_docs)
+        self.bigram_keys = np.concatenate(bigram_keys)
+    
+    @staticmethod
+    def distinct(keys: np.ndarray) -> tuple:
+        """Sorted distinct values and their counts; a sort is cheaper here than np.unique's hashing"""
+        keys = np.sort(keys)
+        first = np.ones(len(keys), dtype=bool)
+        np.not_equal(keys[1:], keys[:-1], out=first[1:])
+        starts = np.flatnonzero(first)
+        return keys[starts], np.diff(np.append(starts, len(keys)))
+    
+    def score(self, query: str) -> np.ndarray:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.size:
+            return np.zeros(self.size)
+        
+        # Terms missing from the pool keep their IDF in the normalizer but match nothing
+        ids = np.array([self.vocabulary.get(term, -1) for term in terms])
+        known = ids >= 0
+        df = np.zeros(len(terms))
+        df[known] = self.document_frequency[ids[known]]
+        idf = np.log1p((self.size - df + 0.5) / (df + 0.5))
+        column = np.full(self.width, -1)
+        column[ids[known]] = np.nonzero(known)[0]
+        
+        # documents x query terms, one column per term, summed over weighted fields
+        term_scores = np.zeros((self.size, len(terms)))
+        for name, weight in FIELD_WEIGHTS.items():
+            field_data = self.fields[name]
+            columns = column[field_data['terms']]
+            hit = columns >= 0
+            docs = field_data['docs'][hit]
+            tf = field_data['tf'][hit]
+            norm = 1 - BM25_B + BM25_B * field_data['lengths'][docs] / (self.average_length[name] or 1)
+            # tf * (k1 + 1) / (tf + k1 * norm), over its upper bound of k1 + 1
+            term_scores[docs, columns[hit]] += weight * tf / (tf + BM25_K1 * norm)
+        
+        scores = term_scores @ idf / idf.sum()
+        
+        bigrams = len(terms) - 1
+        if bigrams:
+            return scores + PHRASE_BONUS * self.phrase_coverage(ids, bigrams)
+        return scores
+    
+    def phrase_coverage(self, ids: np.ndarray, bigrams: int) -> np.ndarray:
+        """Per document, the fraction of adjacent query-term pairs that appear adjacently in title or snippet"""
+        keys = np.unique([a * self.width + b for a, b in zip(ids, ids[1:]) if a >= 0 and b >= 0])
+        if not len(keys):
+            return np.zeros(self.size)
+        hit = np.isin(self.bigram_keys, keys)
+        # Each query pair counts once per document, however often it occurs there
+        matched = np.unique(self.bigram_docs[hit] * len(keys) + np.searchsorted(keys, self.bigram_keys[hit]))
+        return np.bincount(matched // len(keys), minlength=self.size) / bigrams
+
+# Optional semantic rerank: a small local CPU embedding model blended with BM25.
+# Off unless SEMANTIC_RERANK is set and sentence-transformers is installed; the model
+# is loaded from the local Hugging Face cache, so set HF_HUB_OFFLINE=1 to run offline.
+SEMANTIC_RERANK = os.getenv('SEMANTIC_RERANK', 'false').lower() in ('1', 'true', 'yes')
+SEMANTIC_RERANK_MODEL = os.getenv('SEMANTIC_RERANK_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+SEMANTIC_RERANK_WEIGHT = float(os.getenv('SEMANTIC_RERANK_WEIGHT', '0.4'))
+SEMANTIC_RERANK_BUDGET_MS = float(os.getenv('SEMANTIC_RERANK_BUDGET_MS', '300'))
+SEMANTIC_BATCH_SIZE = 32
+EMBEDDING_CACHE_TTL = int(os.getenv('EMBEDDING_CACHE_TTL', str(30 * 24 * 60 * 60)))
+
+class SemanticReranker:
+    """Cosine similarity between query and title+snippet embeddings, cached by URL"""
+    
+    def __init__(self, model_name: str = SEMANTIC_RERANK_MODEL, enabled: bool = SEMANTIC_RERANK):
+        self.model_name = model_name
+        self.model = None
+        self.stats = {'embedded': 0, 'cached': 0, 'over_budget': 0}
+        self._lock = threading.Lock()
+        if enabled and SentenceTransformer is None:
+            print("⚠️  SEMANTIC_RERANK is set but sentence-transformers is not installed")
+        elif enabled:
+            # Loading takes a few seconds; rank lexically until it is ready
+            threading.Thread(target=self._load, daemon=True).start()
+    
+    def _load(self):
+        try:
+            model = SentenceTransformer(self.model_name, device='cpu')
+            with self._lock:
+                self.model = model
+            print(f"🧭 Semantic rerank ready ({self.model_name})")
+        except Exception as e:
+            print(f"Semantic rerank disabled: {e}")
     
-    def batch_process_results(self, results: List[Dict], query: str) -> List[Dict]:
-        """Process multiple results with AI summaries"""
-        print(f"🤖 Generating AI summaries with Gemini Flash 2.5...")
+    @property
+    def ready(self) -> bool:
+        return self.model is not None
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        with self._lock:
+            vectors = self.model.encode(texts, batch_size=SEMANTIC_BATCH_SIZE,
+                                        normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(vectors, dtype=np.float32)
+    
+    def cache_key(self, url: str) -> str:
+        return f"{self.model_name}|{url}"
+    
+    def similarities(self, results: List[Dict], query: str, embeddings: Optional[Dict] = None) -> np.ndarray:
+        """Cosine per result in [0, 1]; NaN where the document could not be embedded within budget.
+        
+        embeddings, if given, keeps the vectors of one request (the query's under
+        None, documents' by URL), so a pool re-scored as each source lands embeds
+        the query and reads each document's cached vector only once.
+        """
+        started = time.monotonic()
+        budget = SEMANTIC_RERANK_BUDGET_MS / 1000
+        embeddings = {} if embeddings is None else embeddings
+        if embeddings.get(None) is None:
+            embeddings[None] = self.embed([query])[0]
+        query_vector = embeddings[None]
+        vectors = [None] * len(results)
         
-        enhanced_results = []
+        pending = []
         for i, result in enumerate(results):
-            print(f"Processing {i+1}/{len(results)}...")
-            
-            summary, relevance = self.generate_summary_and_relevance(result, query)
-            
-            result['ai_summary'] = summary
-            result['relevance_explanation'] = relevance
-            
-            enhanced_results.append(result)
-            
-            # Rate limiting
-            time.sleep(0.5)
+            url = result.get('url')
+            if url and url in embeddings:
+                vectors[i] = embeddings[url]
+                continue
+            cached = research_cache.get('embedding', self.cache_key(url)) if url else None
+            if cached:
+                vectors[i] = embeddings[url] = np.frombuffer(base64.b64decode(cached),
+                                                             dtype=np.float16).astype(np.float32)
+                self.stats['cached'] += 1
+            else:
+                pending.append(i)
+        
+        for start in range(0, len(pending), SEMANTIC_BATCH_SIZE):
+            if time.monotonic() - started > budget:
+                self.stats['over_budget'] += len(pending) - start
+                break
+            chunk = pending[start:start + SEMANTIC_BATCH_SIZE]
+            texts = [f"{results[i].get('title') or ''}. {results[i].get('snippet') or ''}" for i in chunk]
+            for i, vector in zip(chunk, self.embed(texts)):
+                vectors[i] = vector
+                if results[i].get('url'):
+                    embeddings[results[i]['url']] = vector
+                    # float16 halves the stored size; cosine precision is unaffected at this scale
+                    encoded = base64.b64encode(vector.astype(np.float16).tobytes()).decode('ascii')
+                    research_cache.set('embedding', self.cache_key(results[i]['url']), encoded, EMBEDDING_CACHE_TTL)
+            self.stats['embedded'] += len(chunk)
         
-        return enhanced_results
+        scores = np.full(len(results), np.nan)
+        embedded = [i for i, vector in enumerate(vectors) if vector is not None]
+        if embedded:
+            scores[embedded] = np.clip(np.stack([vectors[i] for i in embedded]) @ query_vector, 0.0, 1.0)
+        return scores
+    
+    def blend(self, results: List[Dict], query: str, lexical: np.ndarray,
+              embeddings: Optional[Dict] = None) -> np.ndarray:
+        """Weighted mix of lexical and semantic scores; documents without an embedding keep their lexical score"""
+        try:
+            semantic = self.similarities(results, query, embeddings)
+        except Exception as e:
+            print(f"Semantic rerank error: {e}")
+            return lexical
+        blended = (1 - SEMANTIC_RERANK_WEIGHT) * lexical + SEMANTIC_RERANK_WEIGHT * semantic
+        return np.where(np.isnan(semantic), lexical, blended)
+
+semantic_reranker = SemanticReranker()
+
+def result_id(url: str) -> str:
+    """Stable id for a result: hash of its canonical URL, so tracking params and www. don't matter"""
+    return hashlib.sha256(DeduplicationAgent.canonical_url(url).encode('utf-8')).hexdigest()[:16]
 
 class EnhancedFilterAgent:
     """Advanced filtering with multiple signals"""
     
-    def calculate_relevance(self, result: Dict, query: str) -> float:
-        """Calculate relevance score with multiple factors"""
-        query_terms = set(query.lower().split())
-        title_terms = set(result['title'].lower().split())
-        snippet_terms = set(result['snippet'].lower().split())
-        
-        # Text matching
-        title_match = len(query_terms & title_terms) / len(query_terms) if query_terms else 0
-        snippet_match = len(query_terms & snippet_terms) / len(query_terms) if query_terms else 0
-        
-        base_score = (title_match * 0.6 + snippet_match * 0.4)
-        
+    source_multipliers = {
+        'academic': 1.3,
+        'paper': 1.3,
+        'news': 1.1,
+        'blog': 1.0,
+        'archive': 0.9,
+        'web': 0.8
+    }
+    
+    def boosts(self, results: List[Dict]) -> np.ndarray:
+        """Source-type and recency multipliers for the whole pool, applied on top of the lexical score"""
         # Source type bonuses
-        source_multipliers = {
-            'academic': 1.3,
-            'paper': 1.3,
-            'news': 1.1,
-            'blog': 1.0,
-            'archive': 0.9,
-            'web': 0.8
-        }
+        multipliers = np.array([self.source_multipliers.get(result.get('source_type', 'web'), 1.0)
+                                for result in results])
         
-        source_type = result.get('source_type', 'web')
-        base_score *= source_multipliers.get(source_type, 1.0)
+        # Recency bonus (within last year / two years); undated results get none
+        ordinals = np.array([result['published_ordinal'] if 'published_ordinal' in result
+                             else normalize_published_date(result.get('published_date'))
+                             for result in results], dtype=float)
+        days_old = date.today().toordinal() - ordinals
+        recency = np.where(days_old < 365, 1.1, np.where(days_old < 730, 1.05, 1.0))
+        recency[ordinals == 0] = 1.0
         
-        # Recency bonus (within last year)
-        try:
-            date_str = result.get('published_date', '')
-            if date_str:
-                # Parse various date formats
-                for fmt in ['%Y-%m-%d', '%Y-%m', '%Y', '%Y/%m/%d']:
-                    try:
-                        pub_date = datetime.strptime(date_str[:10], fmt)
-                        days_old = (datetime.now() - pub_date).days
-                        if days_old < 365:
-                            recency_bonus = 1.1
-                        elif days_old < 730:
-                            recency_bonus = 1.05
-                        else:
-                            recency_bonus = 1.0
-                        base_score *= recency_bonus
-                        break
-                    except:
-                        continue
-        except:
-            pass
+        return multipliers * recency
+    
+    def score_pool(self, results: List[Dict], query: str, embeddings: Optional[Dict] = None) -> np.ndarray:
+        """BM25 relevance for every result in the pool in one pass, blended with semantic similarity when enabled, with boosts, capped at 1.0.
         
-        return min(base_score, 1.0)
+        With the semantic rerank on this runs the embedding model, so coroutines
+        call it (and rank) through asyncio.to_thread.
+        """
+        if not results:
+            return np.zeros(0)
+        lexical = BM25Index(results).score(query)
+        if semantic_reranker.ready:
+            lexical = semantic_reranker.blend(results, query, lexical, embeddings)
+        return np.minimum(lexical * self.boosts(results), 1.0)
+    
+    def calculate_relevance(self, result: Dict, query: str) -> float:
+        """Calculate relevance score for a single result (no pool statistics)"""
+        return float(self.score_pool([result], query)[0])
+    
+    def rank(self, results: List[Dict], query: str, min_relevance: float = 0.15,
+             embeddings: Optional[Dict] = None) -> List[tuple]:
+        """(result, relevance) pairs above the threshold, best first"""
+        scores = self.score_pool(results, query, embeddings)
+        # Stable sort keeps source order among equal scores
+        return [(results[i], float(scores[i])) for i in np.argsort(-scores, kind='stable')
+                if scores[i] >= min_relevance]
+    
+    def rerank_with_content(self, window: List[tuple], query: str, embeddings: Optional[Dict] = None) -> List[tuple]:
+        """Re-score (result, relevance) pairs as one pool: snippet plus extracted page text, or the snippet alone where no text was fetched"""
+        if not any(result.get('content') for result, _ in window):
+            return window
+        # One pool, so every result shares the same IDF and average field length
+        docs = [dict(result, snippet=f"{result['snippet']} {result['content'][:CONTENT_RANK_CHARS]}")
+                if result.get('content') else result
+                for result, _ in window]
+        scores = self.score_pool(docs, query, embeddings)
+        return [(window[i][0], float(scores[i])) for i in np.argsort(-scores, kind='stable')]
     
-    def filter_and_rank(self, results: List[Dict], query: str, min_relevance: float = 0.15) -> List[ResearchResult]:
+    @staticmethod
+    def to_research_result(result: Dict, relevance: float) -> ResearchResult:
+        return ResearchResult(
+            title=result['title'],
+            url=result['url'],
+            snippet=result['snippet'],
+            source_type=result['source_type'],
+            source_name=result.get('source_name', ''),
+            relevance_score=relevance,
+            published_date=result.get('published_date', ''),
+            published_ordinal=int(result.get('published_ordinal') or 0),
+            authors=result.get('authors', ''),
+            ai_summary=result.get('ai_summary', ''),
+            relevance_explanation=result.get('relevance_explanation', ''),
+            content_preview=(result.get('content') or result.get('snippet', ''))[:200],
+            sources=result.get('sources') or [result.get('source_name', '')],
+            result_id=result_id(result['url'])
+        )
+    
+    def filter_and_rank(self, results: List[Dict], query: str, min_relevance: float = 0.15,
+                        embeddings: Optional[Dict] = None) -> List[ResearchResult]:
         """Filter and rank with enhanced criteria"""
-        research_results = []
-        
-        for result in results:
-            relevance = self.calculate_relevance(result, query)
-            
-            if relevance >= min_relevance:
-                research_results.append(
-                    ResearchResult(
-                        title=result['title'],
-                        url=result['url'],
-                        snippet=result['snippet'],
-                        source_type=result['source_type'],
-                        source_name=result.get('source_name', ''),
-                        relevance_score=relevance,
-                        published_date=result.get('published_date', ''),
-                        authors=result.get('authors', ''),
-                        ai_summary=result.get('ai_summary', ''),
-                        relevance_explanation=result.get('relevance_explanation', ''),
-                        content_preview=result.get('snippet', '')[:200]
-                    )
-                )
-        
-        # Sort by relevance
-        research_results.sort(key=lambda x: x.relevance_score, reverse=True)
-        return research_results
+        return [self.to_research_result(result, relevance)
+                for result, relevance in self.rank(results, query, min_relevance, embeddings)]
 
 class EnhancedSummaryAgent:
     """Generate comprehensive research summary"""
@@ -680,8 +2337,9 @@ class EnhancedSummaryAgent:
                 source_names[result.source_name] = source_names.get(result.source_name, 0) + 1
         
         # Date range
-        dates = [r.published_date for r in results if r.published_date]
-        date_range = f"{min(dates)} to {max(dates)}" if dates else "Various dates"
+        dates = [r.published_ordinal for r in results if r.published_ordinal]
+        date_range = (f"{date.fromordinal(min(dates)).isoformat()} to {date.fromordinal(max(dates)).isoformat()}"
+                      if dates else "Various dates")
         
         # Top sources
         top_sources = sorted(source_names.items(), key=lambda x: x[1], reverse=True)[:5]
@@ -696,51 +2354,855 @@ class EnhancedSummaryAgent:
             'top_sources': [{'name': name, 'count': count} for name, count in top_sources]
         }
 
+# Optional full-text stage: the top-K result pages are fetched, their main text is
+# extracted while streaming and used to re-rank that window and to summarize.
+# Off unless CONTENT_FETCH_TOP_K > 0 or the request asks for it.
+CONTENT_FETCH_TOP_K = int(os.getenv('CONTENT_FETCH_TOP_K', '0'))
+CONTENT_FETCH_MAX_BYTES = int(os.getenv('CONTENT_FETCH_MAX_BYTES', str(512 * 1024)))
+CONTENT_FETCH_TIMEOUT = float(os.getenv('CONTENT_FETCH_TIMEOUT', '5'))
+CONTENT_HOST_CONCURRENCY = int(os.getenv('CONTENT_HOST_CONCURRENCY', '2'))
+CONTENT_HOST_DELAY = float(os.getenv('CONTENT_HOST_DELAY', '0.5'))
+CONTENT_FRESH_SECONDS = int(os.getenv('CONTENT_FRESH_SECONDS', str(24 * 60 * 60)))
+CONTENT_CACHE_TTL = 30 * 24 * 60 * 60
+CONTENT_MAX_CHARS = 20000
+CONTENT_RANK_CHARS = 2000
+CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+class MainTextExtractor(HTMLParser):
+    """Streaming main-text extraction: text blocks outside navigation, scripts and forms.
+    
+    Blocks inside <article>/<main> win when the page has them; short fragments
+    (menu entries, bylines, buttons) are dropped.
+    """
+    
+    SKIP_TAGS = {'script', 'style', 'noscript', 'nav', 'header', 'footer', 'aside', 'form',
+                 'svg', 'iframe', 'template', 'button', 'select'}
+    BLOCK_TAGS = {'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'blockquote', 'pre',
+                  'td', 'dd', 'dt', 'figcaption'}
+    MAIN_TAGS = {'article', 'main'}
+    MIN_BLOCK_CHARS = 30
+    
+    def __init__(self, max_chars: int = CONTENT_MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.skip_depth = 0
+        self.main_depth = 0
+        self.block_depth = 0
+        self.blocks = []
+        self.main_blocks = []
+        self.current = []
+        self.chars = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in self.MAIN_TAGS:
+            self.main_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.flush()
+            self.block_depth += 1
+    
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.MAIN_TAGS:
+            self.flush()
+            self.main_depth = max(0, self.main_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.flush()
+            self.block_depth = max(0, self.block_depth - 1)
+    
+    def handle_data(self, data):
+        if self.block_depth and not self.skip_depth:
+            self.current.append(data)
+    
+    def flush(self):
+        text = ' '.join(''.join(self.current).split())
+        self.current = []
+        if len(text) >= self.MIN_BLOCK_CHARS:
+            (self.main_blocks if self.main_depth else self.blocks).append(text)
+            self.chars += len(text)
+    
+    @property
+    def full(self) -> bool:
+        return self.chars >= self.max_chars
+    
+    def text(self) -> str:
+        self.flush()
+        return '\n'.join(self.main_blocks or self.blocks)[:self.max_chars]
+
+class HostPoliteness:
+    """Per-host limits for fetching third-party pages: concurrent requests and spacing between starts"""
+    
+    def __init__(self, concurrency: int = CONTENT_HOST_CONCURRENCY, delay: float = CONTENT_HOST_DELAY):
+        self.concurrency = concurrency
+        self.delay = delay
+        self._slots = {}
+        self._next_start = {}
+    
+    @contextlib.asynccontextmanager
+    async def slot(self, host: str, delay: Optional[float] = None):
+        semaphore = self._slots.setdefault(host, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            start = max(now, self._next_start.get(host, 0.0))
+            self._next_start[host] = start + (self.delay if delay is None else delay)
+            if start > now:
+                await asyncio.sleep(start - now)
+            yield
+
+class ContentFetcher:
+    """Fetches result pages politely and caches their extracted text by URL, revalidating with ETag/Last-Modified"""
+    
+    def __init__(self):
+        self.politeness = HostPoliteness()
+        self.stats = {'fetched': 0, 'not_modified': 0, 'cache_hits': 0, 'skipped': 0, 'errors': 0}
+    
+    async def fetch_text(self, url: str) -> str:
+        cached = await research_cache.aget('page', url)
+        if cached and time.time() - cached['fetched_at'] < CONTENT_FRESH_SECONDS:
+            self.stats['cache_hits'] += 1
+            return cached['text']
+        
+        headers = {}
+        if cached and cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached and cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+        
+        async with self.politeness.slot(urlsplit(url).hostname or ''):
+            async with http_client.open(url, headers=headers, timeout=CONTENT_FETCH_TIMEOUT) as response:
+                if response.status == 304 and cached:
+                    self.stats['not_modified'] += 1
+                    page = dict(cached, fetched_at=time.time())
+                    await research_cache.aset('page', url, page, CONTENT_CACHE_TTL)
+                    return page['text']
+                response.raise_for_status()
+                
+                if response.content_type not in CONTENT_TYPES:
+                    self.stats['skipped'] += 1
+                    return ''
+                text = await self.read_text(response)
+        
+        self.stats['fetched'] += 1
+        await research_cache.aset('page', url, {
+            'text': text,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time()
+        }, CONTENT_CACHE_TTL)
+        return text
+    
+    @staticmethod
+    async def read_text(response: aiohttp.ClientResponse, max_bytes: int = CONTENT_FETCH_MAX_BYTES,
+                        extractor: Optional[MainTextExtractor] = None) -> str:
+        """Decode and parse the body as it streams in, stopping at the byte cap or once enough text is found"""
+        try:
+            decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+        except LookupError:
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        extractor = extractor or MainTextExtractor()
+        plain = response.content_type == 'text/plain'
+        parts = []
+        received = 0
+        async for chunk in response.content.iter_chunked(16384):
+            chunk = chunk[:max_bytes - received]
+            received += len(chunk)
+            if plain:
+                parts.append(decoder.decode(chunk))
+            else:
+                extractor.feed(decoder.decode(chunk))
+            if received >= max_bytes or extractor.full:
+                break
+        
+        if plain:
+            parts.append(decoder.decode(b'', final=True))
+            return ' '.join(''.join(parts).split())[:CONTENT_MAX_CHARS]
+        extractor.feed(decoder.decode(b'', final=True))
+        return extractor.text()
+    
+    async def fetch_all(self, results: List[Dict], timeout: float = CONTENT_FETCH_TIMEOUT) -> int:
+        """Fill result['content'] for as many results as finish within the timeout; returns how many did"""
+        async def fetch(result: Dict):
+            try:
+                result['content'] = await self.fetch_text(result['url'])
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"Content fetch error for {result['url']}: {e}")
+        
+        tasks = [asyncio.ensure_future(fetch(result)) for result in results if result.get('url')]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        return sum(1 for result in results if result.get('content'))
+
+content_fetcher = ContentFetcher()
+
+# Crawler: search hits seed a frontier that expands along citations and related
+# links. Each host has its own queue and is fetched by at most one worker at a
+# time, spaced by its robots.txt Crawl-delay (or CRAWL_DEFAULT_DELAY), so many
+# workers spread across many hosts instead of piling onto one.
+CRAWL_USER_AGENT = os.getenv('CRAWL_USER_AGENT', 'Web_crawler/1.0 (research assistant)')
+CRAWL_WORKERS = int(os.getenv('CRAWL_WORKERS', '16'))
+CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '50'))
+CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '2'))
+CRAWL_MAX_PAGES_PER_HOST = int(os.getenv('CRAWL_MAX_PAGES_PER_HOST', '10'))
+CRAWL_DEFAULT_DELAY = float(os.getenv('CRAWL_DEFAULT_DELAY', '1.0'))
+CRAWL_MAX_DELAY = float(os.getenv('CRAWL_MAX_DELAY', '30'))
+CRAWL_FETCH_TIMEOUT = float(os.getenv('CRAWL_FETCH_TIMEOUT', '10'))
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', '60'))
+CRAWL_TEXT_CHARS = 2000
+ROBOTS_CACHE_TTL = 24 * 60 * 60
+ROBOTS_RETRY_TTL = 10 * 60
+ROBOTS_MAX_BYTES = 500 * 1024
+
+class PageExtractor(MainTextExtractor):
+    """Main text plus title and outgoing links; links in the content body (citations) rank ahead of the rest"""
+    
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.base_url = base_url
+        self.links = {}
+        self.title = ''
+        self.in_title = False
+    
+    @property
+    def full(self) -> bool:
+        # Keep reading to the byte cap: links further down still matter
+        return False
+    
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        attrs = dict(attrs)
+        if tag == 'title':
+            self.in_title = True
+        elif tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag == 'a' and attrs.get('href') and not self.skip_depth:
+            in_content = bool(self.main_depth or self.block_depth) or 'related' in (attrs.get('rel') or '')
+            self.add_link(attrs['href'], 0 if in_content else 1)
+        elif tag in ('blockquote', 'q') and attrs.get('cite'):
+            self.add_link(attrs['cite'], 0)
+    
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if tag == 'title':
+            self.in_title = False
+    
+    def handle_data(self, data):
+        super().handle_data(data)
+        if self.in_title:
+            self.title += data
+    
+    def add_link(self, href: str, rank: int):
+        url = urldefrag(urljoin(self.base_url, href.strip()))[0]
+        if urlsplit(url).scheme in ('http', 'https'):
+            self.links[url] = min(rank, self.links.get(url, rank))
+
+class RobotRules(RobotFileParser):
+    """robots.txt rules that also accept fractional Crawl-delay values; the stdlib parser only takes integers"""
+    
+    def parse(self, lines):
+        lines = list(lines)
+        super().parse(lines)
+        self.delays = {}
+        agents, in_rules = [], False
+        for line in lines:
+            name, _, value = line.split('#', 1)[0].partition(':')
+            name, value = name.strip().lower(), value.strip()
+            if name == 'user-agent':
+                # A user-agent line after rules starts a new group
+                if in_rules:
+                    agents, in_rules = [], False
+                agents.append(value.lower())
+            elif name in ('allow', 'disallow', 'crawl-delay'):
+                in_rules = True
+                try:
+                    delay = float(value) if name == 'crawl-delay' else None
+                except ValueError:
+                    continue
+                if delay is not None:
+                    for agent in agents:
+                        self.delays.setdefault(agent, delay)
+    
+    def crawl_delay(self, useragent: str) -> Optional[float]:
+        # Same product-token matching as RobotFileParser's entries
+        token = useragent.split('/')[0].lower()
+        for agent, delay in self.delays.items():
+            if agent != '*' and agent in token:
+                return delay
+        return self.delays.get('*')
+
+class RobotsCache:
+    """Parsed robots.txt per origin, shared through the result cache.
+    
+    Per RFC 9309 a missing robots.txt (4xx) allows everything; an unreachable one
+    (5xx or network error) disallows everything until it is retried.
+    """
+    
+    def __init__(self, user_agent: str = CRAWL_USER_AGENT):
+        self.user_agent = user_agent
+        self._parsers = {}
+        self._locks = {}
+    
+    async def rules(self, url: str) -> RobotRules:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        cached = self._parsers.get(origin)
+        if cached and cached[0] > time.time():
+            return cached[1]
+        
+        async with self._locks.setdefault(origin, asyncio.Lock()):
+            cached = self._parsers.get(origin)
+            if cached and cached[0] > time.time():
+                return cached[1]
+            
+            entry = await research_cache.aget('robots', origin)
+            if entry is None:
+                entry = await self.fetch(origin)
+                await research_cache.aset('robots', origin, entry, entry['ttl'])
+            parser = RobotRules()
+            parser.parse(entry['body'].splitlines())
+            self._parsers[origin] = (time.time() + entry['ttl'], parser)
+            return parser
+    
+    async def fetch(self, origin: str) -> Dict[str, Any]:
+        disallow_all = {'body': 'User-agent: *\nDisallow: /', 'ttl': ROBOTS_RETRY_TTL}
+        try:
+            async with http_client.open(f"{origin}/robots.txt", headers={'User-Agent': self.user_agent},
+                                        timeout=CRAWL_FETCH_TIMEOUT) as response:
+                if response.status >= 500:
+                    return disallow_all
+                if response.status >= 400:
+                    return {'body': '', 'ttl': ROBOTS_CACHE_TTL}
+                body = await response.content.read(ROBOTS_MAX_BYTES)
+                while len(body) < ROBOTS_MAX_BYTES and not response.content.at_eof():
+                    body += await response.content.read(ROBOTS_MAX_BYTES - len(body))
+                return {'body': body.decode('utf-8', errors='replace'), 'ttl': ROBOTS_CACHE_TTL}
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"robots.txt unreachable for {origin}: {e}")
+            return disallow_all
+    
+    def delay(self, rules: RobotRules) -> float:
+        delay = rules.crawl_delay(self.user_agent)
+        return min(float(delay), CRAWL_MAX_DELAY) if delay is not None else CRAWL_DEFAULT_DELAY
+
+class CrawlFrontier:
+    """URL frontier with one priority queue per host and a ready-time heap across hosts.
+    
+    A host is handed to at most one worker at a time and becomes ready again only
+    after its delay, so throughput comes from breadth across hosts.
+    """
+    
+    def __init__(self, max_pages: int, max_depth: int, max_per_host: int = CRAWL_MAX_PAGES_PER_HOST,
+                 allowed_hosts: Optional[set] = None):
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.max_per_host = max_per_host
+        self.allowed_hosts = allowed_hosts
+        self.queues = {}
+        self.ready = []
+        self.waiting = set()
+        self.checked_out = set()
+        self.next_allowed = {}
+        self.host_counts = Counter()
+        self.seen = set()
+        self.scheduled = 0
+        self.in_flight = 0
+        self.sequence = 0
+        self.changed = asyncio.Condition()
+    
+    def push_host(self, host: str):
+        # A checked-out host is re-armed by done(), once its next start time is known
+        if host not in self.waiting and host not in self.checked_out and self.queues.get(host):
+            self.waiting.add(host)
+            ready_at = max(asyncio.get_running_loop().time(), self.next_allowed.get(host, 0.0))
+            heapq.heappush(self.ready, (ready_at, host))
+    
+    async def add(self, url: str, depth: int, parent: Optional[str] = None, rank: int = 0) -> bool:
+        host = urlsplit(url).hostname or ''
+        key = DeduplicationAgent.canonical_url(url)
+        if (not host or depth > self.max_depth or key in self.seen
+                or self.host_counts[host] >= self.max_per_host
+                or (self.allowed_hosts is not None and host not in self.allowed_hosts)):
+            return False
+        self.seen.add(key)
+        self.host_counts[host] += 1
+        self.sequence += 1
+        # Shallow first, citations before other links, then discovery order
+        heapq.heappush(self.queues.setdefault(host, []), (depth, rank, self.sequence, url, parent))
+        async with self.changed:
+            self.push_host(host)
+            self.changed.notify_all()
+        return True
+    
+    async def get(self) -> Optional[tuple]:
+        """Next (host, url, depth, parent) whose host is due; None once the crawl is finished"""
+        loop = asyncio.get_running_loop()
+        async with self.changed:
+            while True:
+                if self.scheduled >= self.max_pages or not self.ready:
+                    if self.in_flight == 0:
+                        return None
+                    await self.changed.wait()
+                    continue
+                
+                ready_at, host = self.ready[0]
+                wait = ready_at - loop.time()
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self.changed.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                heapq.heappop(self.ready)
+                self.waiting.discard(host)
+                self.checked_out.add(host)
+                depth, _, _, url, parent = heapq.heappop(self.queues[host])
+                self.scheduled += 1
+                self.in_flight += 1
+                return host, url, depth, parent
+    
+    async def done(self, host: str, delay: float, fetched: bool = True):
+        """Release a host after its fetch; it is due again after `delay` seconds"""
+        async with self.changed:
+            self.in_flight -= 1
+            if not fetched:
+                self.scheduled -= 1
+            self.next_allowed[host] = asyncio.get_running_loop().time() + delay
+            self.checked_out.discard(host)
+            self.push_host(host)
+            self.changed.notify_all()
+
+class WebCrawler:
+    """Concurrent, polite crawl from seed URLs with depth and page limits"""
+    
+    def __init__(self):
+        self.robots = RobotsCache()
+    
+    async def fetch_page(self, url: str) -> Dict[str, Any]:
+        # Redirects are not followed here: the target goes back through the frontier
+        # for its own robots check and host politeness
+        async with http_client.open(url, headers={'User-Agent': CRAWL_USER_AGENT},
+                                    timeout=CRAWL_FETCH_TIMEOUT, max_redirects=0) as response:
+            page = {'url': url, 'status': response.status, 'title': '', 'text': '', 'links': {}}
+            if response.status in REDIRECT_STATUSES and response.headers.get('Location'):
+                return dict(page, redirect=urljoin(url, response.headers['Location']))
+            if response.status >= 400 or response.content_type not in CONTENT_TYPES:
+                return page
+            extractor = PageExtractor(url)
+            text = await ContentFetcher.read_text(response, extractor=extractor)
+            return dict(page, title=' '.join(extractor.title.split()), text=text, links=extractor.links)
+    
+    async def crawl(self, seeds: List[str], max_pages: int = CRAWL_MAX_PAGES, max_depth: int = CRAWL_MAX_DEPTH,
+                    same_host: bool = False, timeout: float = CRAWL_TIMEOUT,
+                    workers: int = CRAWL_WORKERS) -> Dict[str, Any]:
+        start = time.time()
+        allowed = {urlsplit(url).hostname for url in seeds} if same_host else None
+        frontier = CrawlFrontier(max_pages, max_depth, allowed_hosts=allowed)
+        for url in seeds:
+            await frontier.add(url, 0)
+        
+        pages = []
+        stats = Counter()
+        
+        async def worker():
+            while (item := await frontier.get()) is not None:
+                host, url, depth, parent = item
+                delay, fetched = CRAWL_DEFAULT_DELAY, False
+                try:
+                    rules = await self.robots.rules(url)
+                    delay = self.robots.delay(rules)
+                    if not rules.can_fetch(CRAWL_USER_AGENT, url):
+                        # Nothing was requested from the host, so its next URL need not wait
+                        stats['disallowed'] += 1
+                        delay = 0.0
+                        continue
+                    fetched = True
+                    page = await self.fetch_page(url)
+                    if page.get('redirect'):
+                        # Same depth: a redirect is not a link hop
+                        stats['redirects'] += 1
+                        if await frontier.add(page['redirect'], depth, url):
+                            stats['queued'] += 1
+                        continue
+                    links = page.pop('links')
+                    pages.append(dict(page, depth=depth, parent=parent, links_found=len(links),
+                                      text=page['text'][:CRAWL_TEXT_CHARS]))
+                    stats['fetched'] += 1
+                    for link, rank in links.items():
+                        if await frontier.add(link, depth + 1, url, rank):
+                            stats['queued'] += 1
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"Crawl error for {url}: {e}")
+                finally:
+                    await frontier.done(host, delay, fetched)
+        
+        tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, workers))]
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        
+        elapsed = time.time() - start
+        print(f"🕷️  Crawled {len(pages)} pages across {len({urlsplit(p['url']).hostname for p in pages})} hosts "
+              f"in {elapsed:.1f}s")
+        return {
+            'pages': pages,
+            'stats': {
+                'fetched': stats['fetched'],
+                'disallowed': stats['disallowed'],
+                'errors': stats['errors'],
+                'redirects': stats['redirects'],
+                'queued': stats['queued'],
+                'hosts': len({urlsplit(p['url']).hostname for p in pages}),
+                'timed_out': bool(pending),
+                'elapsed_seconds': round(elapsed, 2),
+                'pages_per_second': round(len(pages) / elapsed, 2) if elapsed else 0.0
+            }
+        }
+
+web_crawler = WebCrawler()
+
+# Research jobs run in the background; their state is written to the result
+# cache's SQLite table so any worker can answer a poll, and expires after the retention period
+RESEARCH_JOB_RETENTION = int(os.getenv('RESEARCH_JOB_RETENTION', '3600'))
+RESEARCH_MAX_CONCURRENT_JOBS = int(os.getenv('RESEARCH_MAX_CONCURRENT_JOBS', '8'))
+
+class JobStore:
+    """Job records: this worker's jobs in a dict, every worker's in the cache's SQLite table.
+    
+    Jobs skip the cache's LRU layer. A poll may land on any worker, and only the
+    row the owning worker keeps rewriting is current; a running job must also
+    never be evicted by unrelated cache traffic.
+    """
+    
+    def __init__(self, cache: ResultCache, retention: float = RESEARCH_JOB_RETENTION):
+        self.cache = cache
+        self.retention = retention
+        # job_id -> (expires_at, snapshot), oldest save first
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        # Saves come from the event loop on every progress event; one writer thread
+        # keeps SQLite off the loop and applies them in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-writer')
+    
+    def save(self, job: Dict[str, Any]) -> Future:
+        now = time.time()
+        expires_at = now + self.retention
+        # A snapshot, so pollers never see the dict the job keeps mutating
+        snapshot = copy.deepcopy(job)
+        with self._lock:
+            self._jobs[job['job_id']] = (expires_at, snapshot)
+            self._jobs.move_to_end(job['job_id'])
+            while self._jobs and next(iter(self._jobs.values()))[0] <= now:
+                self._jobs.popitem(last=False)
+        return self._writer.submit(self.cache.write_disk, 'job', job['job_id'], snapshot, expires_at)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if entry is not None and entry[0] > time.time():
+            return copy.deepcopy(entry[1])
+        # Another worker's job: its latest row, never a memoized copy
+        row = self.cache.read_disk('job', job_id)
+        return row[0] if row else None
+
+# Lazy summaries: returned results are kept by id so the client can ask for one
+# summary at a time; optionally the top N are summarized in the background
+RESULT_RECORD_TTL = int(os.getenv('RESULT_RECORD_TTL', str(7 * 24 * 60 * 60)))
+SUMMARY_PREFETCH_TOP_N = int(os.getenv('SUMMARY_PREFETCH_TOP_N', '0'))
+RESULT_RECORD_FIELDS = ('title', 'url', 'snippet', 'source_type', 'source_name', 'content')
+
 class EnhancedResearchOrchestrator:
     """Orchestrate multi-source research with RAG"""
     
     def __init__(self):
         self.search_agent = EnhancedSearchAgent()
         self.rag_agent = GeminiRAGAgent()
+        self.dedup_agent = DeduplicationAgent()
         self.filter_agent = EnhancedFilterAgent()
         self.summary_agent = EnhancedSummaryAgent()
+        self.job_slots = asyncio.Semaphore(RESEARCH_MAX_CONCURRENT_JOBS)
+        self.jobs = JobStore(research_cache)
+        self._background = set()
+    
+    def cache_key(self, query: str, num_results: int, enrich: bool = True, fetch_content: int = 0,
+                  budget: Optional[SearchBudget] = None) -> str:
+        sources = ','.join(sorted(adapter.name for adapter in self.search_agent.enabled_sources()))
+        # The budget decides which sources run and whether results are enriched
+        budget = budget or SearchBudget()
+        return (f"{normalize_query(query)}|{sources}|{num_results}|{bool(GEMINI_API_KEY) and enrich}"
+                f"|{semantic_reranker.ready}|{fetch_content}"
+                f"|{budget.max_latency}|{budget.max_paid_calls}|{budget.max_llm_tokens}")
+    
+    def build_response(self, query: str, results: List[ResearchResult], enrich: bool = True) -> Dict[str, Any]:
+        return {
+            'query': query,
+            'timestamp': datetime.now().isoformat(),
+            'summary': self.summary_agent.generate_summary(results, query),
+            'results': [asdict(r) for r in results],
+            'ai_powered': bool(GEMINI_API_KEY),
+            'enrichment': ('inline' if enrich else 'deferred') if GEMINI_API_KEY else 'unavailable'
+        }
+    
+    def enough_results(self, query: str, num_results: int,
+                       embeddings: Optional[Dict] = None) -> Callable[[List[Dict]], Awaitable[bool]]:
+        """Early-stop test: the pool already holds num_results high-relevance results"""
+        async def enough(pool: List[Dict]) -> bool:
+            scores = await asyncio.to_thread(self.filter_agent.score_pool, self.dedup_agent.deduplicate(pool),
+                                             query, embeddings)
+            return int((scores >= HIGH_RELEVANCE).sum()) >= num_results
+        return enough
+    
+    def record_yield(self, returned: Dict[str, int], pool: List[Dict], ranked: List[ResearchResult]):
+        """Credit each source that ran with the share of its results that made the final list"""
+        keys_by_url = {result['url']: result.get('source_keys') or [result.get('source_key')] for result in pool}
+        useful = Counter(key for r in ranked for key in keys_by_url.get(r.url, []) if key)
+        for name, count in returned.items():
+            source_health.record_yield(name, count, min(useful[name], count))
+    
+    def remember_results(self, query: str, results: List[Dict]):
+        """Store what a summary needs for each returned result, keyed by result id"""
+        for result in results:
+            record = {key: result.get(key, '') for key in RESULT_RECORD_FIELDS}
+            record['content'] = record['content'][:BATCH_CONTENT_CHARS]
+            research_cache.set('result', result_id(result['url']), {'query': query, 'result': record},
+                               RESULT_RECORD_TTL)
+    
+    @staticmethod
+    def result_summary_key(rid: str, query: str) -> str:
+        return f"{rid}|{normalize_query(query)}"
+    
+    async def aresult_summary(self, rid: str, query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Summary and relevance for one stored result, generated on first request; None if the id is unknown"""
+        record = await research_cache.aget('result', rid)
+        if record is None:
+            return None
+        query = query or record['query']
+        key = self.result_summary_key(rid, query)
+        cached = await research_cache.aget('result_summary', key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        summary, relevance = await self.rag_agent.agenerate_summary_and_relevance(record['result'], query)
+        answer = {'result_id': rid, 'query': query, 'ai_summary': summary, 'relevance_explanation': relevance}
+        # Fallback text after a Gemini error is returned but not cached, so the next view retries
+        if relevance != RELEVANCE_UNAVAILABLE:
+            await research_cache.aset('result_summary', key, answer, SUMMARY_CACHE_TTL)
+        return dict(answer, cached=False)
+    
+    async def prefetch_summaries(self, query: str, results: List[Dict]):
+        """Batch-summarize the top results in the background so the first expansions are instant"""
+        pending = [dict(result) for result in results
+                   if await research_cache.aget('result_summary',
+                                                self.result_summary_key(result_id(result['url']), query)) is None]
+        if not pending:
+            return
+        try:
+            await self.rag_agent.abatch_process_results(pending, query)
+        except Exception as e:
+            print(f"Summary prefetch error: {e}")
+            return
+        for result in pending:
+            if result.get('ai_summary') and result.get('relevance_explanation') != RELEVANCE_UNAVAILABLE:
+                rid = result_id(result['url'])
+                await research_cache.aset('result_summary', self.result_summary_key(rid, query), {
+                    'result_id': rid,
+                    'query': query,
+                    'ai_summary': result['ai_summary'],
+                    'relevance_explanation': result.get('relevance_explanation', '')
+                }, SUMMARY_CACHE_TTL)
     
-    async def research(self, query: str, num_results: int = 15) -> Dict[str, Any]:
+    def start_prefetch(self, query: str, results: List[Dict]):
+        task = asyncio.ensure_future(self.prefetch_summaries(query, results))
+        # The loop only keeps weak references to tasks
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def research(self, query: str, num_results: int = 15,
+                       on_event: Optional[Callable[[str, Dict], None]] = None,
+                       budget: Optional[SearchBudget] = None, enrich: bool = True,
+                       prefetch: int = SUMMARY_PREFETCH_TOP_N,
+                       fetch_content: int = CONTENT_FETCH_TOP_K) -> Dict[str, Any]:
+        """Run the full pipeline within the request's budget.
+        
+        on_event, if given, receives progress as it happens: ('source', per-source raw
+        results), ('ranked', the current top results), ('summary', one AI summary) and
+        finally ('done', the complete response). With enrich=False the Gemini step
+        is skipped and summaries are left for the client to load per result, with
+        the top `prefetch` results summarized in the background. With fetch_content > 0
+        the pages of that many top results are fetched, re-ranked on their text and
+        summarized from it.
+        """
         print(f"\n{'='*60}")
         print(f"🔬 Starting enhanced research: {query}")
         print(f"{'='*60}\n")
         
-        # Step 1: Multi-source search
-        all_results = self.search_agent.search_all_sources(query, num_results * 3)
+        emit = on_event or (lambda event, data: None)
+        budget = budget or SearchBudget()
+        
+        cache_key = self.cache_key(query, num_results, enrich, fetch_content, budget)
+        cached = await research_cache.aget('research', cache_key)
+        if cached is not None:
+            print(f"⚡ Served from cache")
+            response = dict(cached, cached=True)
+            emit('done', response)
+            return response
+        
+        # Step 1: Multi-source search, re-ranking the pool as each source lands.
+        # Scoring runs off the event loop, and embeddings are computed once per request
+        pool = []
+        returned = {}
+        embeddings = {}
+        
+        async def on_source(name: str, results: List[Dict]):
+            returned[name] = len(results)
+            if not on_event:
+                return
+            emit('source', {'source': name, 'results': results})
+            pool.extend(results)
+            ranked = await asyncio.to_thread(self.filter_agent.filter_and_rank, self.dedup_agent.deduplicate(pool),
+                                             query, embeddings=embeddings)
+            emit('ranked', self.build_response(query, ranked[:num_results], enrich))
+        
+        report = {}
+        all_results = await self.search_agent.asearch_all_sources(
+            query, num_results * 3, on_results=on_source, budget=budget,
+            stop_when=self.enough_results(query, num_results, embeddings), report=report)
         print(f"\n✅ Collected {len(all_results)} raw results\n")
         
-        # Step 2: AI Enhancement with RAG
-        if all_results and GEMINI_API_KEY:
-            # Process top results with AI
-            top_results = all_results[:min(num_results * 2, len(all_results))]
-            enhanced_results = self.rag_agent.batch_process_results(top_results, query)
+        # Step 2: Merge cross-source duplicates, rank cheaply and keep only the top K
+        all_results = self.dedup_agent.deduplicate(all_results)
+        ranked = await asyncio.to_thread(self.filter_agent.rank, all_results, query, embeddings=embeddings)
+        print(f"\n✅ Ranked {len(ranked)} relevant results, keeping top {min(num_results, len(ranked))}\n")
+        
+        # Step 2b: Full text for the head of the list, which then competes on its content
+        if ranked and fetch_content > 0:
+            window = ranked[:fetch_content]
+            fetched = await content_fetcher.fetch_all([result for result, _ in window])
+            print(f"📄 Extracted text from {fetched}/{len(window)} pages")
+            ranked = await asyncio.to_thread(self.filter_agent.rerank_with_content, window, query,
+                                             embeddings) + ranked[fetch_content:]
+        top = ranked[:num_results]
+        # One thread hop for all the record writes
+        await asyncio.to_thread(self.remember_results, query, [result for result, _ in top])
+        
+        # Step 3: AI enhancement, paid only for results that will be shown
+        if top and GEMINI_API_KEY and enrich:
+            def on_summary(result: Dict):
+                emit('summary', {
+                    'url': result['url'],
+                    'ai_summary': result.get('ai_summary', ''),
+                    'relevance_explanation': result.get('relevance_explanation', '')
+                })
             
-            # Merge with remaining results
-            all_results = enhanced_results + all_results[len(enhanced_results):]
+            await self.rag_agent.abatch_process_results(
+                [result for result, _ in top], query, on_result=on_summary if on_event else None,
+                max_tokens=budget.max_llm_tokens)
+        elif top and GEMINI_API_KEY and prefetch > 0:
+            self.start_prefetch(query, [result for result, _ in top[:prefetch]])
         
-        # Step 3: Filter and rank
-        filtered_results = self.filter_agent.filter_and_rank(all_results, query)
-        print(f"\n✅ Filtered to {len(filtered_results)} relevant results\n")
+        filtered_results = [self.filter_agent.to_research_result(result, relevance) for result, relevance in top]
+        self.record_yield(returned, all_results, filtered_results)
         
         # Step 4: Generate summary
-        summary = self.summary_agent.generate_summary(filtered_results[:num_results], query)
+        response = self.build_response(query, filtered_results, enrich)
         
         print(f"{'='*60}")
         print(f"✨ Research complete!")
         print(f"{'='*60}\n")
         
-        return {
+        # Only complete runs are cached: a source lost to the deadline, an open breaker,
+        # an error or an early stop, or a Gemini fallback would otherwise be replayed
+        # for the whole TTL. The response is only as fresh as its most volatile source.
+        complete = (len(report['completed']) == len(report['planned'])
+                    and not any(r.relevance_explanation == RELEVANCE_UNAVAILABLE for r in filtered_results))
+        if filtered_results and complete:
+            ttl = min(SOURCE_TYPE_TTL.get(SOURCE_REGISTRY[name].category, DEFAULT_CACHE_TTL)
+                      for name in report['planned'])
+            await research_cache.aset('research', cache_key, response, ttl)
+        
+        response = dict(response, cached=False)
+        emit('done', response)
+        return response
+    
+    async def crawl(self, query: Optional[str] = None, seeds: Optional[List[str]] = None, num_seeds: int = 10,
+                    budget: Optional[SearchBudget] = None, **options) -> Dict[str, Any]:
+        """Crawl outward from the given URLs and/or the top-ranked search hits for a query"""
+        seeds = list(seeds or [])
+        if query:
+            results = await self.search_agent.asearch_all_sources(query, num_seeds * 3, budget=budget)
+            ranked = await asyncio.to_thread(self.filter_agent.rank, self.dedup_agent.deduplicate(results), query)
+            seeds += [result['url'] for result, _ in ranked[:num_seeds] if result.get('url')]
+        crawl = await web_crawler.crawl(seeds, **options)
+        return {'query': query, 'seeds': seeds, 'timestamp': datetime.now().isoformat(), **crawl}
+    
+    def submit_job(self, query: str, num_results: int = 15,
+                   budget: Optional[SearchBudget] = None, enrich: bool = True,
+                   fetch_content: int = CONTENT_FETCH_TOP_K) -> Dict[str, Any]:
+        """Queue a research run on the background loop and return its initial job record"""
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
             'query': query,
-            'timestamp': datetime.now().isoformat(),
-            'summary': summary,
-            'results': [asdict(r) for r in filtered_results[:num_results]],
-            'ai_powered': bool(GEMINI_API_KEY)
+            'num_results': num_results,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': datetime.now().isoformat(),
+            'progress': {
+                'sources_done': 0,
+                'sources_total': len(self.search_agent.enabled_sources()),
+                'summaries_done': 0
+            },
+            'partial_results': [],
+            'result': None,
+            'error': None
         }
+        # Written before the id is handed out, so a poll on any worker finds it
+        self.save_job(job).result()
+        event_loop.submit(self.run_job(job, budget, enrich, fetch_content))
+        return job
+    
+    def save_job(self, job: Dict[str, Any]) -> Future:
+        job['updated_at'] = datetime.now().isoformat()
+        return self.jobs.save(job)
+    
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+    
+    async def run_job(self, job: Dict[str, Any], budget: Optional[SearchBudget] = None, enrich: bool = True,
+                      fetch_content: int = CONTENT_FETCH_TOP_K):
+        def on_event(event: str, data: Dict):
+            if event == 'source':
+                job['progress']['sources_done'] += 1
+            elif event == 'ranked':
+                job['partial_results'] = data['results']
+            elif event == 'summary':
+                job['progress']['summaries_done'] += 1
+            else:
+                return
+            self.save_job(job)
+        
+        async with self.job_slots:
+            job['status'] = 'running'
+            self.save_job(job)
+            try:
+                job['result'] = await self.research(job['query'], job['num_results'], on_event=on_event,
+                                                    budget=budget, enrich=enrich,
+                                                    fetch_content=fetch_content)
+                job['partial_results'] = []
+                job['status'] = 'completed'
+            except Exception as e:
+                print(f"Research job {job['job_id']} failed: {e}")
+                job['status'] = 'failed'
+                job['error'] = str(e)
+            self.save_job(job)
+
 
 orchestrator = EnhancedResearchOrchestrator()
 
@@ -756,21 +3218,23 @@ def home():
             'RAG-enhanced analysis'
         ],
         'active_sources': {
-            'semantic_scholar': True,
-            'arxiv': True,
-            'pubmed': True,
-            'google_scholar': bool(os.getenv('SERPER_API_KEY')),
-            'google_news': bool(os.getenv('SERPER_API_KEY')),
-            'newsapi': bool(os.getenv('NEWSAPI_KEY')),
-            'substack': bool(os.getenv('SERPER_API_KEY')),
-            'medium': bool(os.getenv('SERPER_API_KEY')),
-            'internet_archive': True,
-            'general_web': bool(os.getenv('SERPER_API_KEY') or os.getenv('BRAVE_API_KEY')),
+            **{adapter.name.lower().replace(' ', '_'): adapter.enabled(orchestrator.search_agent.keys)
+               for adapter in SOURCE_ADAPTERS},
             'gemini_rag': bool(os.getenv('GEMINI_API_KEY'))
         },
         'endpoints': {
-            '/api/search': 'POST - Comprehensive research search',
+            '/api/search': 'POST - Comprehensive research search (optional budget: max_latency, max_paid_calls, max_llm_tokens)',
+            '/api/search/stream': 'POST - Streaming search (NDJSON, or SSE with ?format=sse)',
+            '/api/search/<category>': f"POST - Search one category ({', '.join(SOURCE_CATEGORIES)})",
+            '/api/research/jobs': 'POST - Start a background research job',
+            '/api/research/jobs/<id>': 'GET - Research job progress and results',
+            '/api/results/<id>/summary': 'GET - AI summary for one result (optional ?query=)',
             '/api/sources': 'GET - List available sources',
+            '/api/sources/health': 'GET - Circuit breaker and latency per source',
+            '/api/pool/stats': 'GET - Upstream connection pool statistics',
+            '/api/cache/stats': 'GET - Result cache statistics',
+            '/api/index/stats': 'GET - Local document index statistics',
+            '/api/crawl': 'POST - Crawl from search hits (query) and/or seed URLs (seeds)',
             '/health': 'GET - Health check'
         }
     })
@@ -781,71 +3245,181 @@ def health():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'gemini_configured': bool(GEMINI_API_KEY),
-        'sources_available': sum([
-            bool(os.getenv('SERPER_API_KEY')),
-            bool(os.getenv('BRAVE_API_KEY')),
-            bool(os.getenv('NEWSAPI_KEY')),
-            True,  # Free APIs always available
-        ])
+        'semantic_rerank': semantic_reranker.ready,
+        'sources_available': len(orchestrator.search_agent.enabled_sources())
     })
 
 @app.route('/api/sources')
 def list_sources():
-    """List all available search sources"""
-    sources = {
-        'academic': [
-            {'name': 'Semantic Scholar', 'status': 'active', 'free': True},
-            {'name': 'arXiv', 'status': 'active', 'free': True},
-            {'name': 'PubMed', 'status': 'active', 'free': True},
-            {'name': 'Google Scholar', 'status': 'active' if os.getenv('SERPER_API_KEY') else 'inactive', 'free': False}
-        ],
-        'news': [
-            {'name': 'Google News', 'status': 'active' if os.getenv('SERPER_API_KEY') else 'inactive', 'free': False},
-            {'name': 'NewsAPI', 'status': 'active' if os.getenv('NEWSAPI_KEY') else 'inactive', 'free': False}
-        ],
-        'blogs': [
-            {'name': 'Substack', 'status': 'active' if os.getenv('SERPER_API_KEY') else 'inactive', 'free': False},
-            {'name': 'Medium', 'status': 'active' if os.getenv('SERPER_API_KEY') else 'inactive', 'free': False}
-        ],
-        'archives': [
-            {'name': 'Internet Archive', 'status': 'active', 'free': True}
-        ],
-        'web': [
-            {'name': 'General Web Search', 'status': 'active' if (os.getenv('SERPER_API_KEY') or os.getenv('BRAVE_API_KEY')) else 'inactive', 'free': False}
-        ],
-        'ai': [
-            {'name': 'Gemini Flash 2.5 RAG', 'status': 'active' if GEMINI_API_KEY else 'inactive', 'free': False}
-        ]
-    }
+    """List all registered search sources by category"""
+    keys = orchestrator.search_agent.keys
+    sources = {category: [adapter.describe(keys) for adapter in SOURCE_ADAPTERS if adapter.category == category]
+               for category in SOURCE_CATEGORIES}
+    sources['ai'] = [
+        {'name': 'Gemini Flash 2.5 RAG', 'status': 'active' if GEMINI_API_KEY else 'inactive', 'free': False}
+    ]
     
     return jsonify({
         'sources': sources,
         'total_active': sum(1 for category in sources.values() for source in category if source['status'] == 'active')
     })
 
+@app.route('/api/sources/health')
+def sources_health():
+    """Circuit breaker state and latency percentiles per source"""
+    return jsonify({
+        'pid': os.getpid(),
+        'sources': source_health.stats()
+    })
+
+@app.route('/api/pool/stats')
+def pool_stats():
+    """Connection pool reuse per upstream host"""
+    return jsonify({
+        'pid': os.getpid(),
+        'hosts': http_client.stats(),
+        'batching': request_batcher.stats,
+        'http_cache': dict(http_client.cache.stats, **http_client.cache.size()) if http_client.cache.db_path else None
+    })
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Result cache hit rates for this worker"""
+    return jsonify({
+        'pid': os.getpid(),
+        'memory_entries': len(research_cache),
+        'disk_enabled': bool(research_cache.db_path),
+        **research_cache.stats,
+        'pages': content_fetcher.stats
+    })
+
+@app.route('/api/crawl', methods=['POST'])
+def crawl():
+    """Polite crawl seeded by search results for 'query' and/or explicit 'seeds' URLs"""
+    data = request.get_json(silent=True) or {}
+    query = (data.get('query') or '').strip() or None
+    seeds = data.get('seeds') or []
+    
+    if not query and not seeds:
+        return jsonify({'error': 'query or seeds is required'}), 400
+    if query and len(query) < 3:
+        return jsonify({'error': 'Query must be at least 3 characters'}), 400
+    if not isinstance(seeds, list) or not all(isinstance(url, str) and urlsplit(url).scheme in ('http', 'https')
+                                              for url in seeds):
+        return jsonify({'error': 'seeds must be a list of http(s) URLs'}), 400
+    
+    try:
+        num_seeds = int(data.get('num_seeds', 10))
+        max_pages = int(data.get('max_pages', CRAWL_MAX_PAGES))
+        max_depth = int(data.get('max_depth', CRAWL_MAX_DEPTH))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'num_seeds, max_pages and max_depth must be integers'}), 400
+    if not (0 < num_seeds <= 50 and 0 < max_pages <= 500 and 0 <= max_depth <= 5):
+        return jsonify({'error': 'Limits: num_seeds 1-50, max_pages 1-500, max_depth 0-5'}), 400
+    budget, error = parse_budget()
+    if error:
+        return error
+    
+    try:
+        result = event_loop.run(orchestrator.crawl(query, seeds, num_seeds, budget,
+                                                   max_pages=max_pages, max_depth=max_depth,
+                                                   same_host=bool(data.get('same_host', False))))
+        return jsonify(result)
+    except Exception as e:
+        print(f"Crawl error: {str(e)}")
+        return jsonify({'error': f'Crawl failed: {str(e)}'}), 500
+
+@app.route('/api/index/stats')
+def index_stats():
+    """Local document index size per source and how often it answered instead of upstream"""
+    counts = document_index.counts()
+    return jsonify({
+        'pid': os.getpid(),
+        'enabled': bool(document_index.db_path),
+        'documents': sum(counts.values()),
+        'by_source': counts,
+        **document_index.stats
+    })
+
+def parse_search_request():
+    """Validate a /api/search style body; returns (query, num_results, error response)"""
+    data = request.get_json(silent=True)
+    
+    if not data or 'query' not in data:
+        return None, None, (jsonify({'error': 'Query parameter is required'}), 400)
+    
+    query = data['query'].strip()
+    num_results = data.get('num_results', 15)
+    
+    if len(query) < 3:
+        return None, None, (jsonify({'error': 'Query must be at least 3 characters'}), 400)
+    
+    if num_results > 50:
+        return None, None, (jsonify({'error': 'Maximum 50 results allowed'}), 400)
+    
+    return query, num_results, None
+
+def parse_budget():
+    """Optional 'budget' object in the request body; returns (SearchBudget, error response)"""
+    data = request.get_json(silent=True) or {}
+    limits = data.get('budget') or {}
+    if not isinstance(limits, dict):
+        return None, (jsonify({'error': 'budget must be an object'}), 400)
+    
+    budget = SearchBudget()
+    for name, cast in (('max_latency', float), ('max_paid_calls', int), ('max_llm_tokens', int)):
+        if limits.get(name) is None:
+            continue
+        try:
+            value = cast(limits[name])
+        except (TypeError, ValueError):
+            return None, (jsonify({'error': f'budget.{name} must be a number'}), 400)
+        if value < 0:
+            return None, (jsonify({'error': f'budget.{name} must not be negative'}), 400)
+        setattr(budget, name, value)
+    return budget, None
+
+def wants_enrichment(default: bool = True) -> bool:
+    """Optional 'enrich' flag in the request body: summarize inline or leave it to the client"""
+    data = request.get_json(silent=True) or {}
+    return bool(data.get('enrich', default))
+
+def prefetch_count() -> int:
+    """Optional 'prefetch' count in the request body: top results to summarize in the background"""
+    data = request.get_json(silent=True) or {}
+    try:
+        return max(0, int(data.get('prefetch', SUMMARY_PREFETCH_TOP_N)))
+    except (TypeError, ValueError):
+        return SUMMARY_PREFETCH_TOP_N
+
+def content_fetch_count(num_results: int) -> int:
+    """Optional 'fetch_content' in the request body: how many top pages to fetch (true = all returned results)"""
+    data = request.get_json(silent=True) or {}
+    value = data.get('fetch_content', CONTENT_FETCH_TOP_K)
+    if value is True:
+        return num_results
+    try:
+        return max(0, min(int(value), num_results))
+    except (TypeError, ValueError):
+        return min(CONTENT_FETCH_TOP_K, num_results)
+
 @app.route('/api/search', methods=['POST'])
 def search():
     """Enhanced search endpoint with RAG"""
     try:
-        data = request.get_json()
-        
-        if not data or 'query' not in data:
-            return jsonify({'error': 'Query parameter is required'}), 400
-        
-        query = data['query'].strip()
-        num_results = data.get('num_results', 15)
-        
-        if len(query) < 3:
-            return jsonify({'error': 'Query must be at least 3 characters'}), 400
+        query, num_results, error = parse_search_request()
+        if error:
+            return error
+        budget, error = parse_budget()
+        if error:
+            return error
         
-        if num_results > 50:
-            return jsonify({'error': 'Maximum 50 results allowed'}), 400
-        
-        # Run async research
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(orchestrator.research(query, num_results))
-        loop.close()
+        # Run async research on the worker's shared event loop
+        # Summaries are loaded per result from /api/results/<id>/summary unless asked for inline
+        results = event_loop.run(orchestrator.research(query, num_results, budget=budget,
+                                                       enrich=wants_enrichment(default=False),
+                                                       prefetch=prefetch_count(),
+                                                       fetch_content=content_fetch_count(num_results)))
         
         return jsonify(results)
     
@@ -855,68 +3429,125 @@ def search():
         traceback.print_exc()
         return jsonify({'error': f'Search failed: {str(e)}'}), 500
 
-@app.route('/api/search/academic', methods=['POST'])
-def search_academic_only():
-    """Search only academic sources"""
-    try:
-        data = request.get_json()
-        query = data.get('query', '').strip()
-        num_results = data.get('num_results', 10)
-        
-        if len(query) < 3:
-            return jsonify({'error': 'Query must be at least 3 characters'}), 400
-        
-        agent = EnhancedSearchAgent()
-        results = []
-        results.extend(agent.search_semantic_scholar(query, num_results // 3))
-        results.extend(agent.search_arxiv(query, num_results // 3))
-        results.extend(agent.search_pubmed(query, num_results // 3))
-        
-        # Apply RAG if available
-        if GEMINI_API_KEY and results:
-            rag = GeminiRAGAgent()
-            results = rag.batch_process_results(results[:num_results], query)
-        
-        filter_agent = EnhancedFilterAgent()
-        filtered = filter_agent.filter_and_rank(results, query)
-        
-        return jsonify({
-            'query': query,
-            'source_filter': 'academic',
-            'results': [asdict(r) for r in filtered[:num_results]]
-        })
+@app.route('/api/search/stream', methods=['POST'])
+def search_stream():
+    """Streaming search: NDJSON (default) or Server-Sent Events with ?format=sse"""
+    query, num_results, error = parse_search_request()
+    if error:
+        return error
+    budget, error = parse_budget()
+    if error:
+        return error
+    
+    use_sse = request.args.get('format') == 'sse' or 'text/event-stream' in request.headers.get('Accept', '')
+    events = queue.Queue()
+    finished = object()
+    
+    # Called on the event loop thread; queue.Queue hands events to this request thread
+    future = event_loop.submit(orchestrator.research(query, num_results,
+                                                     on_event=lambda event, data: events.put((event, data)),
+                                                     budget=budget, enrich=wants_enrichment(default=False),
+                                                     prefetch=prefetch_count(),
+                                                     fetch_content=content_fetch_count(num_results)))
+    future.add_done_callback(lambda _: events.put(finished))
+    
+    def generate():
+        try:
+            while True:
+                item = events.get()
+                if item is finished:
+                    break
+                event, data = item
+                if use_sse:
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+                else:
+                    yield json.dumps({'event': event, 'data': data}) + '\n'
+            
+            if future.exception():
+                message = {'error': f'Search failed: {future.exception()}'}
+                yield (f"event: error\ndata: {json.dumps(message)}\n\n" if use_sse
+                       else json.dumps({'event': 'error', 'data': message}) + '\n')
+        finally:
+            # Client went away mid-stream; stop spending on upstreams and Gemini
+            future.cancel()
+    
+    return Response(generate(),
+                    mimetype='text/event-stream' if use_sse else 'application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/research/jobs', methods=['POST'])
+def create_research_job():
+    """Start research in the background and return a job id to poll"""
+    query, num_results, error = parse_search_request()
+    if error:
+        return error
+    budget, error = parse_budget()
+    if error:
+        return error
+    
+    job = orchestrator.submit_job(query, num_results, budget, wants_enrichment(),
+                                  content_fetch_count(num_results))
+    return jsonify({
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/api/research/jobs/{job['job_id']}",
+        'retention_seconds': RESEARCH_JOB_RETENTION
+    }), 202
+
+@app.route('/api/research/jobs/<job_id>')
+def get_research_job(job_id):
+    """Progress, partial results and (once completed) the full research response"""
+    job = orchestrator.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job)
+
+@app.route('/api/results/<result_id>/summary')
+def result_summary(result_id):
+    """AI summary and relevance for one search result, generated on first view and cached"""
+    if not GEMINI_API_KEY:
+        return jsonify({'error': 'AI summaries unavailable - Gemini API key not configured'}), 503
     
+    try:
+        answer = event_loop.run(orchestrator.aresult_summary(result_id, request.args.get('query')))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+    
+    if answer is None:
+        return jsonify({'error': 'Unknown or expired result id'}), 404
+    return jsonify(answer)
 
-@app.route('/api/search/news', methods=['POST'])
-def search_news_only():
-    """Search only news sources"""
+@app.route('/api/search/<category>', methods=['POST'])
+def search_category(category):
+    """Search only the sources of one registry category (academic, news, blog, archive, web)"""
+    if category not in SOURCE_CATEGORIES:
+        return jsonify({'error': f"Unknown category '{category}'", 'categories': SOURCE_CATEGORIES}), 404
+    
+    query, num_results, error = parse_search_request()
+    if error:
+        return error
+    budget, error = parse_budget()
+    if error:
+        return error
+    
     try:
-        data = request.get_json()
-        query = data.get('query', '').strip()
-        num_results = data.get('num_results', 10)
-        
-        if len(query) < 3:
-            return jsonify({'error': 'Query must be at least 3 characters'}), 400
-        
-        agent = EnhancedSearchAgent()
-        results = []
-        results.extend(agent.search_google_news(query, num_results // 2))
-        results.extend(agent.search_newsapi(query, num_results // 2))
-        
-        # Apply RAG if available
-        if GEMINI_API_KEY and results:
-            rag = GeminiRAGAgent()
-            results = rag.batch_process_results(results[:num_results], query)
+        results = orchestrator.search_agent.search_all_sources(query, num_results, category=category,
+                                                               budget=budget)
+        results = orchestrator.dedup_agent.deduplicate(results)
         
+        # Rank first so RAG only runs on the results that are returned
         filter_agent = EnhancedFilterAgent()
-        filtered = filter_agent.filter_and_rank(results, query)
+        top = filter_agent.rank(results, query)[:num_results]
+        orchestrator.remember_results(query, [result for result, _ in top])
+        if GEMINI_API_KEY and top and wants_enrichment():
+            rag = GeminiRAGAgent()
+            event_loop.run(rag.abatch_process_results([result for result, _ in top], query,
+                                                      max_tokens=budget.max_llm_tokens))
         
         return jsonify({
             'query': query,
-            'source_filter': 'news',
-            'results': [asdict(r) for r in filtered[:num_results]]
+            'source_filter': category,
+            'results': [asdict(filter_agent.to_research_result(result, relevance)) for result, relevance in top]
         })
     
     except Exception as e:
@@ -936,26 +3567,12 @@ if __name__ == '__main__':
     print("\n" + "="*70)
     print("🚀 ENHANCED AI RESEARCH ASSISTANT API SERVER v3.0")
     print("="*70)
-    print("\n📚 ACADEMIC SOURCES:")
-    print(f"  ✓ Semantic Scholar (FREE)")
-    print(f"  ✓ arXiv (FREE)")
-    print(f"  ✓ PubMed (FREE)")
-    print(f"  {'✓' if os.getenv('SERPER_API_KEY') else '✗'} Google Scholar")
-    
-    print("\n📰 NEWS SOURCES:")
-    print(f"  {'✓' if os.getenv('SERPER_API_KEY') else '✗'} Google News")
-    print(f"  {'✓' if os.getenv('NEWSAPI_KEY') else '✗'} NewsAPI")
-    
-    print("\n📝 BLOG PLATFORMS:")
-    print(f"  {'✓' if os.getenv('SERPER_API_KEY') else '✗'} Substack")
-    print(f"  {'✓' if os.getenv('SERPER_API_KEY') else '✗'} Medium")
-    
-    print("\n🗄️ ARCHIVES:")
-    print(f"  ✓ Internet Archive (FREE)")
-    
-    print("\n🌐 WEB SEARCH:")
-    print(f"  {'✓' if os.getenv('SERPER_API_KEY') else '✗'} Serper (Google)")
-    print(f"  {'✓' if os.getenv('BRAVE_API_KEY') else '✗'} Brave Search")
+    keys = orchestrator.search_agent.keys
+    for category in SOURCE_CATEGORIES:
+        print(f"\n🔎 {category.upper()} SOURCES:")
+        for adapter in SOURCE_ADAPTERS:
+            if adapter.category == category:
+                print(f"  {'✓' if adapter.enabled(keys) else '✗'} {adapter.name}{'' if adapter.paid else ' (FREE)'}")
     
     print("\n🤖 AI ENHANCEMENT:")
     print(f"  {'✓' if GEMINI_API_KEY else '✗'} Gemini Flash 2.5 RAG")
@@ -968,9 +3585,17 @@ if __name__ == '__main__':
     print(f"  • GET  /           - API information")
     print(f"  • GET  /health     - Health check")
     print(f"  • GET  /api/sources - List all sources")
+    print(f"  • GET  /api/sources/health - Circuit breakers and latency")
+    print(f"  • GET  /api/pool/stats - Connection pool statistics")
+    print(f"  • GET  /api/cache/stats - Result cache statistics")
+    print(f"  • GET  /api/index/stats - Local document index statistics")
+    print(f"  • POST /api/crawl - Crawl from search hits and/or seed URLs")
     print(f"  • POST /api/search - Comprehensive search (all sources)")
-    print(f"  • POST /api/search/academic - Academic sources only")
-    print(f"  • POST /api/search/news - News sources only")
+    print(f"  • POST /api/search/stream - Streaming search (NDJSON / SSE)")
+    print(f"  • POST /api/research/jobs - Start background research job")
+    print(f"  • GET  /api/research/jobs/<id> - Job progress and results")
+    print(f"  • GET  /api/results/<id>/summary - AI summary for one result")
+    print(f"  • POST /api/search/<category> - One category only ({', '.join(SOURCE_CATEGORIES)})")
     
     print("\n🔧 ENVIRONMENT VARIABLES:")
     print(f"  • GEMINI_API_KEY: {'✓ Configured' if GEMINI_API_KEY else '✗ Not set'}")
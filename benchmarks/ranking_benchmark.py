@@ -0,0 +1,140 @@
+"""
+Ranking benchmark: the original scorer, the per-document BM25 loop and batch BM25 scoring
+
+Run from the repository root:
+    python benchmarks/ranking_benchmark.py
+"""
+
+import os
+import math
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import (BM25_B, BM25_K1, FIELD_WEIGHTS, PHRASE_BONUS, STOPWORDS, TOKEN_PATTERN,
+                 EnhancedFilterAgent, stem, tokenize)
+
+QUERY = "graph neural networks for molecular property prediction"
+VOCABULARY = ("graph neural network networks molecular molecule property prediction learning deep "
+              "transformer attention protein chemistry model models benchmark dataset training "
+              "message passing representation drug discovery quantum energy").split()
+SOURCE_TYPES = ['academic', 'news', 'blog', 'archive', 'web']
+DATES = ['2024-03-01', '2023-11', '2021', '2019/05/02', 'Jan 2020', '']
+
+def make_candidates(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [{
+        'title': ' '.join(rng.choices(VOCABULARY, k=rng.randint(5, 12))).capitalize(),
+        'url': f"https://example.org/{i}",
+        'snippet': ' '.join(rng.choices(VOCABULARY, k=rng.randint(20, 50))),
+        'source_type': rng.choice(SOURCE_TYPES),
+        'source_name': 'Benchmark',
+        'published_date': rng.choice(DATES)
+    } for i in range(count)]
+
+def legacy_calculate_relevance(result: dict, query: str) -> float:
+    """The original per-result scorer: set overlap plus strptime recency checks"""
+    query_terms = set(query.lower().split())
+    title_terms = set(result['title'].lower().split())
+    snippet_terms = set(result['snippet'].lower().split())
+    
+    title_match = len(query_terms & title_terms) / len(query_terms) if query_terms else 0
+    snippet_match = len(query_terms & snippet_terms) / len(query_terms) if query_terms else 0
+    base_score = (title_match * 0.6 + snippet_match * 0.4)
+    return min(base_score * legacy_boost(result), 1.0)
+
+def legacy_boost(result: dict) -> float:
+    """Source-type multiplier and strptime recency bonus, as both original scorers applied them"""
+    multiplier = EnhancedFilterAgent.source_multipliers.get(result.get('source_type', 'web'), 1.0)
+    date_str = result.get('published_date', '')
+    if date_str:
+        for fmt in ['%Y-%m-%d', '%Y-%m', '%Y', '%Y/%m/%d']:
+            try:
+                pub_date = datetime.strptime(date_str[:10], fmt)
+                days_old = (datetime.now() - pub_date).days
+                multiplier *= 1.1 if days_old < 365 else 1.05 if days_old < 730 else 1.0
+                break
+            except ValueError:
+                continue
+    return multiplier
+
+def loop_tokenize(text: str) -> list:
+    """Tokenizer as it was before memoization"""
+    return [stem(word) for word in TOKEN_PATTERN.findall((text or '').lower()) if word not in STOPWORDS]
+
+def loop_score_pool(results: list, query: str) -> list:
+    """The pool scorer before vectorization: BM25 over the same pool, one document and term at a time"""
+    size = len(results)
+    fields = {}
+    for name in FIELD_WEIGHTS:
+        tokens = [loop_tokenize(result.get(name) or '') for result in results]
+        lengths = [len(doc) for doc in tokens]
+        fields[name] = (tokens, [Counter(doc) for doc in tokens], lengths, (sum(lengths) / size) if size else 0)
+    document_frequency = Counter()
+    for i in range(size):
+        document_frequency.update(set().union(*(fields[name][1][i] for name in FIELD_WEIGHTS)))
+    
+    terms = list(dict.fromkeys(loop_tokenize(query)))
+    idf = {term: math.log(1 + (size - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+           for term in terms}
+    total_idf = sum(idf.values())
+    bigrams = list(zip(terms, terms[1:]))
+    
+    scores = []
+    for i, result in enumerate(results):
+        score = 0.0
+        for term in terms:
+            term_score = 0.0
+            for name, weight in FIELD_WEIGHTS.items():
+                tokens, counts, lengths, average = fields[name]
+                tf = counts[i].get(term, 0)
+                if tf:
+                    norm = 1 - BM25_B + BM25_B * lengths[i] / (average or 1)
+                    term_score += weight * tf / (tf + BM25_K1 * norm)
+            score += idf[term] * term_score
+        score /= total_idf
+        if bigrams:
+            adjacent = set()
+            for name in FIELD_WEIGHTS:
+                adjacent.update(zip(fields[name][0][i], fields[name][0][i][1:]))
+            score += PHRASE_BONUS * sum(1 for bigram in bigrams if bigram in adjacent) / len(bigrams)
+        scores.append(min(score * legacy_boost(result), 1.0))
+    return scores
+
+def timed(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    agent = EnhancedFilterAgent()
+    
+    def batch_cold():
+        # A fresh pool: no memoized tokens from the previous run
+        tokenize.cache_clear()
+        agent.score_pool(candidates, QUERY)
+    
+    print(f"{'candidates':>10}  {'legacy loop':>12}  {'BM25 loop':>10}  {'batch cold':>11}  {'batch warm':>11}  "
+          f"{'speedup cold/warm':>18}")
+    for count in (100, 1000, 10000):
+        candidates = make_candidates(count)
+        repeat = 5 if count <= 1000 else 2
+        
+        legacy = timed(lambda: [legacy_calculate_relevance(r, QUERY) for r in candidates], repeat)
+        loop = timed(lambda: loop_score_pool(candidates, QUERY), repeat)
+        cold = timed(batch_cold, repeat)
+        # Re-ranking a pool whose records were already tokenized, as during streaming
+        warm = timed(lambda: agent.score_pool(candidates, QUERY), repeat)
+        
+        print(f"{count:>10}  {legacy * 1000:>10.1f}ms  {loop * 1000:>8.1f}ms  {cold * 1000:>9.1f}ms  "
+              f"{warm * 1000:>9.1f}ms  {loop / cold:>11.1f}x / {loop / warm:.1f}x")
+
+if __name__ == '__main__':
+    main()
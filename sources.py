@@ -0,0 +1,334 @@
+"""
+Search source registry shared by app.py and wor_app.py
+Each adapter declares its endpoint, category, cost, rate limit, typical latency
+and how to build the request and parse the response; callers do the HTTP.
+"""
+
+import json
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable
+
+@dataclass
+class SourceRequest:
+    """One upstream HTTP call, independent of the client that sends it"""
+    method: str
+    url: str
+    params: Any = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Optional[str] = None
+    hedge: Optional[str] = None  # hedging key for idempotent GETs
+    response_format: str = 'json'
+    batchable: bool = False  # endpoint also accepts a JSON array of bodies and answers with an array
+
+@dataclass
+class SourceAdapter:
+    """A search source: what it costs, how fast it is, and how to call and parse it"""
+    name: str
+    category: str  # also the source_type of its results
+    endpoint: str
+    build_request: Callable[[str, int, Dict[str, Optional[str]]], SourceRequest]
+    parse: Callable[[Any, int], List[Dict]]
+    required_keys: tuple = ()
+    excluded_by: tuple = ()  # env keys whose presence makes a preferred adapter take over
+    cost_per_call: float = 0.0  # USD
+    rate_limit_per_minute: int = 60
+    typical_latency: float = 1.5  # seconds
+    # Multi-step APIs: build the next request from the previous response (None to stop)
+    follow_up: Optional[Callable[[Any, Dict[str, Optional[str]]], Optional[SourceRequest]]] = None
+    
+    def enabled(self, keys: Dict[str, Optional[str]]) -> bool:
+        return (all(keys.get(key) for key in self.required_keys)
+                and not any(keys.get(key) for key in self.excluded_by))
+    
+    @property
+    def paid(self) -> bool:
+        return self.cost_per_call > 0
+    
+    def describe(self, keys: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'category': self.category,
+            'status': 'active' if self.enabled(keys) else 'inactive',
+            'free': not self.paid,
+            'cost_per_call': self.cost_per_call,
+            'rate_limit_per_minute': self.rate_limit_per_minute,
+            'typical_latency_s': self.typical_latency,
+            'requires': list(self.required_keys)
+        }
+
+API_KEY_NAMES = ('SERPER_API_KEY', 'BRAVE_API_KEY', 'NEWSAPI_KEY', 'SEMANTIC_SCHOLAR_API_KEY')
+
+# Serper: one endpoint family, five logical sources
+SERPER_URL = "https://google.serper.dev"
+
+def serper_request(endpoint: str, site: Optional[str] = None):
+    def build(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+        return SourceRequest(
+            method='POST',
+            url=f"{SERPER_URL}/{endpoint}",
+            headers={'X-API-KEY': keys['SERPER_API_KEY'], 'Content-Type': 'application/json'},
+            body=json.dumps({"q": f"{query} site:{site}" if site else query, "num": num_results}),
+            batchable=True
+        )
+    return build
+
+def serper_parser(results_key: str, source_type: str, source_name: str):
+    def parse(data: Dict, num_results: int) -> List[Dict]:
+        return [{
+            'title': item.get('title', ''),
+            'url': item.get('link', ''),
+            'snippet': item.get('snippet', ''),
+            'source_type': source_type,
+            # News items carry their outlet; scholar items a year and publication
+            'source_name': item.get('source') or source_name,
+            'published_date': item.get('date') or str(item.get('year', '')),
+            'authors': item.get('publication', '')
+        } for item in data.get(results_key, [])[:num_results]]
+    return parse
+
+def serper_adapter(name: str, category: str, endpoint: str, results_key: str,
+                   source_name: Optional[str] = None, site: Optional[str] = None) -> SourceAdapter:
+    return SourceAdapter(
+        name=name,
+        category=category,
+        endpoint=f"{SERPER_URL}/{endpoint}",
+        build_request=serper_request(endpoint, site),
+        parse=serper_parser(results_key, category, source_name or name),
+        required_keys=('SERPER_API_KEY',),
+        cost_per_call=0.001,
+        rate_limit_per_minute=300,
+        typical_latency=1.0
+    )
+
+def author_list(names: List[str], total: int) -> str:
+    authors = ', '.join(names[:3])
+    if total > 3:
+        authors += ' et al.'
+    return authors
+
+def semantic_scholar_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    headers = {}
+    if keys.get('SEMANTIC_SCHOLAR_API_KEY'):
+        headers['x-api-key'] = keys['SEMANTIC_SCHOLAR_API_KEY']
+    return SourceRequest(
+        method='GET',
+        url="https://api.semanticscholar.org/graph/v1/paper/search",
+        headers=headers,
+        params={
+            'query': query,
+            'limit': num_results,
+            'fields': 'title,authors,year,abstract,url,publicationDate,venue'
+        },
+        hedge='Semantic Scholar'
+    )
+
+def parse_semantic_scholar(data: Dict, num_results: int) -> List[Dict]:
+    results = []
+    for paper in data.get('data', [])[:num_results]:
+        authors = paper.get('authors', [])
+        results.append({
+            'title': paper.get('title', ''),
+            'url': paper.get('url', ''),
+            'snippet': (paper.get('abstract', '')[:300] + '...') if paper.get('abstract') else '',
+            'source_type': 'academic',
+            'source_name': paper.get('venue') or 'Semantic Scholar',
+            'published_date': paper.get('publicationDate', '') or str(paper.get('year', '')),
+            'authors': author_list([author['name'] for author in authors], len(authors))
+        })
+    return results
+
+def arxiv_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    return SourceRequest(
+        method='GET',
+        url='http://export.arxiv.org/api/query',
+        params={
+            'search_query': f'all:{query}',
+            'start': 0,
+            'max_results': num_results,
+            'sortBy': 'relevance'
+        },
+        hedge='arXiv',
+        response_format='xml'
+    )
+
+def parse_arxiv(content: bytes, num_results: int) -> List[Dict]:
+    root = ET.fromstring(content)
+    ns = {
+        'atom': 'http://www.w3.org/2005/Atom',
+        'arxiv': 'http://arxiv.org/schemas/atom'
+    }
+    
+    results = []
+    for entry in root.findall('atom:entry', ns)[:num_results]:
+        title = entry.find('atom:title', ns).text.strip().replace('\n', ' ')
+        summary = entry.find('atom:summary', ns).text.strip().replace('\n', ' ')
+        authors = entry.findall('atom:author', ns)
+        results.append({
+            'title': title,
+            'url': entry.find('atom:id', ns).text.strip(),
+            'snippet': summary[:300] + '...',
+            'source_type': 'academic',
+            'source_name': 'arXiv',
+            'published_date': entry.find('atom:published', ns).text.strip()[:10],
+            'authors': author_list([author.find('atom:name', ns).text for author in authors], len(authors))
+        })
+    return results
+
+PUBMED_EUTILS = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+
+def pubmed_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    return SourceRequest(
+        method='GET',
+        url=f"{PUBMED_EUTILS}/esearch.fcgi",
+        params={'db': 'pubmed', 'term': query, 'retmax': num_results, 'retmode': 'json'},
+        hedge='PubMed esearch'
+    )
+
+def pubmed_summaries(search_data: Dict, keys: Dict[str, Optional[str]]) -> Optional[SourceRequest]:
+    """esearch only returns ids; esummary fetches the records"""
+    ids = search_data.get('esearchresult', {}).get('idlist', [])
+    if not ids:
+        return None
+    return SourceRequest(
+        method='GET',
+        url=f"{PUBMED_EUTILS}/esummary.fcgi",
+        params={'db': 'pubmed', 'id': ','.join(ids), 'retmode': 'json'}
+    )
+
+def parse_pubmed(data: Dict, num_results: int) -> List[Dict]:
+    records = data.get('result', {})
+    results = []
+    for pmid in records.get('uids', [])[:num_results]:
+        paper = records.get(pmid, {})
+        authors = paper.get('authors', [])
+        results.append({
+            'title': paper.get('title', ''),
+            'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+            'snippet': paper.get('source', ''),
+            'source_type': 'academic',
+            'source_name': 'PubMed',
+            'published_date': paper.get('pubdate', ''),
+            'authors': author_list([author.get('name', '') for author in authors], len(authors))
+        })
+    return results
+
+def newsapi_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    return SourceRequest(
+        method='GET',
+        url="https://newsapi.org/v2/everything",
+        params={
+            'q': query,
+            'pageSize': num_results,
+            'sortBy': 'relevancy',
+            'language': 'en',
+            'apiKey': keys['NEWSAPI_KEY']
+        }
+    )
+
+def parse_newsapi(data: Dict, num_results: int) -> List[Dict]:
+    return [{
+        'title': article.get('title', ''),
+        'url': article.get('url', ''),
+        'snippet': article.get('description', '') or article.get('content', ''),
+        'source_type': 'news',
+        'source_name': article.get('source', {}).get('name', 'News'),
+        'published_date': (article.get('publishedAt') or '')[:10],
+        'authors': article.get('author', '')
+    } for article in data.get('articles', [])[:num_results]]
+
+def internet_archive_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    # Repeated keys as pairs so both aiohttp and requests encode them
+    params = [('q', query), ('rows', num_results), ('page', 1), ('output', 'json')]
+    params += [('fl[]', name) for name in ['identifier', 'title', 'description', 'date', 'creator']]
+    return SourceRequest(
+        method='GET',
+        url="https://archive.org/advancedsearch.php",
+        params=params,
+        hedge='Internet Archive'
+    )
+
+def first(value: Any) -> str:
+    """Archive fields are a string or a list of strings"""
+    if isinstance(value, list):
+        return value[0] if value else ''
+    return value or ''
+
+def parse_internet_archive(data: Dict, num_results: int) -> List[Dict]:
+    return [{
+        'title': item.get('title', ''),
+        'url': f"https://archive.org/details/{item.get('identifier', '')}",
+        'snippet': first(item.get('description')),
+        'source_type': 'archive',
+        'source_name': 'Internet Archive',
+        'published_date': item.get('date', ''),
+        'authors': first(item.get('creator'))
+    } for item in data.get('response', {}).get('docs', [])[:num_results]]
+
+def brave_request(query: str, num_results: int, keys: Dict[str, Optional[str]]) -> SourceRequest:
+    return SourceRequest(
+        method='GET',
+        url="https://api.search.brave.com/res/v1/web/search",
+        headers={'Accept': 'application/json', 'X-Subscription-Token': keys['BRAVE_API_KEY']},
+        params={'q': query, 'count': num_results}
+    )
+
+def parse_brave(data: Dict, num_results: int) -> List[Dict]:
+    return [{
+        'title': item.get('title', ''),
+        'url': item.get('url', ''),
+        'snippet': item.get('description', ''),
+        'source_type': 'web',
+        'source_name': 'Web',
+        'published_date': item.get('age', '')
+    } for item in data.get('web', {}).get('results', [])[:num_results]]
+
+# Registry order is the order results are listed in before ranking
+SOURCE_ADAPTERS = [
+    SourceAdapter(
+        name='Semantic Scholar', category='academic',
+        endpoint="https://api.semanticscholar.org/graph/v1/paper/search",
+        build_request=semantic_scholar_request, parse=parse_semantic_scholar,
+        rate_limit_per_minute=20, typical_latency=1.5
+    ),
+    SourceAdapter(
+        name='arXiv', category='academic', endpoint='http://export.arxiv.org/api/query',
+        build_request=arxiv_request, parse=parse_arxiv,
+        rate_limit_per_minute=20, typical_latency=2.0
+    ),
+    SourceAdapter(
+        name='PubMed', category='academic', endpoint=f"{PUBMED_EUTILS}/esearch.fcgi",
+        build_request=pubmed_request, parse=parse_pubmed, follow_up=pubmed_summaries,
+        rate_limit_per_minute=90, typical_latency=1.5
+    ),
+    serper_adapter('Google Scholar', 'academic', 'scholar', 'organic'),
+    serper_adapter('Google News', 'news', 'news', 'news', source_name='News'),
+    SourceAdapter(
+        name='NewsAPI', category='news', endpoint="https://newsapi.org/v2/everything",
+        build_request=newsapi_request, parse=parse_newsapi, required_keys=('NEWSAPI_KEY',),
+        cost_per_call=0.002, rate_limit_per_minute=60, typical_latency=1.0
+    ),
+    serper_adapter('Substack', 'blog', 'search', 'organic', site='substack.com'),
+    serper_adapter('Medium', 'blog', 'search', 'organic', site='medium.com'),
+    SourceAdapter(
+        name='Internet Archive', category='archive', endpoint="https://archive.org/advancedsearch.php",
+        build_request=internet_archive_request, parse=parse_internet_archive,
+        rate_limit_per_minute=60, typical_latency=2.5
+    ),
+    serper_adapter('General Web', 'web', 'search', 'organic', source_name='Web'),
+    # Brave only stands in for web search when there is no Serper key
+    SourceAdapter(
+        name='Brave Search', category='web', endpoint="https://api.search.brave.com/res/v1/web/search",
+        build_request=brave_request, parse=parse_brave,
+        required_keys=('BRAVE_API_KEY',), excluded_by=('SERPER_API_KEY',),
+        cost_per_call=0.003, rate_limit_per_minute=60, typical_latency=1.0
+    ),
+]
+
+SOURCE_REGISTRY = {adapter.name: adapter for adapter in SOURCE_ADAPTERS}
+SOURCE_CATEGORIES = list(dict.fromkeys(adapter.category for adapter in SOURCE_ADAPTERS))
+
+def adapters_for(keys: Dict[str, Optional[str]], category: Optional[str] = None) -> List[SourceAdapter]:
+    """Adapters usable with the configured keys, optionally limited to one category"""
+    return [adapter for adapter in SOURCE_ADAPTERS
+            if adapter.enabled(keys) and (category is None or adapter.category == category)]
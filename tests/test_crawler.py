@@ -0,0 +1,152 @@
+"""
+Crawler tests against a local http.server stand-in
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import aiohttp
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep caches out of the shared temp-dir databases
+os.environ.update(RESEARCH_CACHE_DB='', LOCAL_INDEX_DB='', HTTP_CACHE_DB='')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+CRAWL_DELAY = 0.3
+REDIRECTS = {'/moved.html': '/cite4.html', '/sneaky.html': '/private/secret.html'}
+
+PAGE = """<html><head><title>{title}</title></head><body>
+<nav><a href="/nav.html">Navigation link</a></nav>
+<article><p>{title} is a page about graph neural networks with enough text to be kept. {links}</p></article>
+</body></html>"""
+
+def write_site(root: str):
+    pages = {
+        'index.html': ['cite1.html', 'cite2.html', 'private/secret.html'],
+        'cite1.html': ['cite2.html', 'cite3.html', 'index.html'],
+        'cite2.html': ['cite3.html'],
+        'cite3.html': ['cite4.html'],
+        'cite4.html': [],
+        'nav.html': [],
+        'private/secret.html': []
+    }
+    os.makedirs(os.path.join(root, 'private'))
+    for name, links in pages.items():
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(PAGE.format(title=name, links=' '.join(f'<a href="/{link}">{link}</a>' for link in links)))
+    with open(os.path.join(root, 'robots.txt'), 'w') as f:
+        f.write(f"User-agent: *\nCrawl-delay: {CRAWL_DELAY}\nDisallow: /private\n")
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    """Serves the site slowly enough for overlapping requests to show up, recording each one"""
+    
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            server.requests.append((self.path, time.monotonic()))
+        try:
+            time.sleep(0.05)
+            if self.path in REDIRECTS:
+                self.send_response(301)
+                self.send_header('Location', REDIRECTS[self.path])
+                self.end_headers()
+                return
+            super().do_GET()
+        finally:
+            with server.lock:
+                server.active -= 1
+    
+    def log_message(self, format, *args):
+        pass
+
+class CrawlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        write_site(self.root)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), partial(RecordingHandler, directory=self.root))
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.active = 0
+        self.server.max_active = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+        # The stand-in lives on loopback, which page fetches refuse by default
+        app.WEB_FETCH_ALLOW_PRIVATE = True
+    
+    def tearDown(self):
+        app.WEB_FETCH_ALLOW_PRIVATE = False
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def crawl(self, seeds: tuple = ('index.html',), **options) -> dict:
+        return app.event_loop.run(app.web_crawler.crawl([f"{self.base}/{seed}" for seed in seeds], **options),
+                                  timeout=60)
+    
+    def page_requests(self) -> list:
+        return [(path, at) for path, at in self.server.requests if path != '/robots.txt']
+    
+    def test_honours_robots_rules(self):
+        result = self.crawl(max_pages=20, max_depth=3, timeout=30)
+        paths = [path for path, _ in self.server.requests]
+        
+        self.assertEqual(paths.count('/robots.txt'), 1)
+        self.assertNotIn('/private/secret.html', paths)
+        self.assertEqual(result['stats']['disallowed'], 1)
+        self.assertEqual({page['url'] for page in result['pages']},
+                         {f"{self.base}/{name}" for name in
+                          ('index.html', 'cite1.html', 'cite2.html', 'cite3.html', 'cite4.html')})
+    
+    def test_one_request_per_host_spaced_by_crawl_delay(self):
+        self.crawl(max_pages=20, max_depth=3, workers=8, timeout=30)
+        starts = [at for _, at in self.page_requests()]
+        
+        self.assertGreaterEqual(len(starts), 5)
+        self.assertEqual(self.server.max_active, 1)
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        self.assertGreaterEqual(min(gaps), CRAWL_DELAY)
+    
+    def test_depth_and_page_limits(self):
+        result = self.crawl(max_pages=20, max_depth=1, timeout=30)
+        self.assertEqual(max(page['depth'] for page in result['pages']), 1)
+        self.assertNotIn('/cite3.html', [path for path, _ in self.server.requests])
+        
+        result = self.crawl(max_pages=2, max_depth=3, timeout=30)
+        self.assertEqual(len(result['pages']), 2)
+    
+    def test_redirects_go_back_through_the_frontier(self):
+        result = self.crawl(seeds=('moved.html', 'sneaky.html'), max_pages=10, max_depth=0, timeout=30)
+        paths = [path for path, _ in self.server.requests]
+        
+        self.assertEqual(result['stats']['redirects'], 2)
+        self.assertEqual([page['url'] for page in result['pages']], [f"{self.base}/cite4.html"])
+        self.assertNotIn('/private/secret.html', paths)
+    
+    def test_refuses_private_addresses_by_default(self):
+        app.WEB_FETCH_ALLOW_PRIVATE = False
+        localhost = self.base.replace('127.0.0.1', 'localhost')
+        
+        result = app.event_loop.run(app.web_crawler.crawl(
+            [f"{self.base}/index.html", f"{localhost}/index.html", 'http://169.254.169.254/latest/meta-data/'],
+            timeout=30), timeout=60)
+        self.assertEqual(result['pages'], [])
+        self.assertEqual(self.server.requests, [])
+        
+        with self.assertRaises(aiohttp.InvalidURL):
+            app.check_fetchable('http://[::ffff:10.0.0.1]/')
+        app.check_fetchable('http://93.184.216.34/')
+
+if __name__ == '__main__':
+    unittest.main()
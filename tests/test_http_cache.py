@@ -0,0 +1,129 @@
+"""
+HTTP cache tests: source adapter requests through PooledHTTPClient against a local aiohttp server
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from aiohttp import web
+
+# Keep caches out of the shared temp-dir databases
+os.environ.update(RESEARCH_CACHE_DB='', LOCAL_INDEX_DB='', HTTP_CACHE_DB='')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+from sources import SOURCE_REGISTRY
+
+ARCHIVE_PAYLOAD = {'response': {'docs': [
+    {'identifier': 'gnn-survey', 'title': 'Graph neural networks: a survey', 'description': 'A survey',
+     'date': '2020-01-01T00:00:00Z', 'creator': ['A. Author']}
+]}}
+
+class HTTPCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.hits = []
+        self.db_path = os.path.join(tempfile.mkdtemp(), 'http_cache.sqlite3')
+        self.client = app.PooledHTTPClient(cache=app.HTTPCache(self.db_path, max_bytes=20000))
+        app.event_loop.run(self.start_server())
+    
+    def tearDown(self):
+        app.event_loop.run(self.stop_server())
+    
+    async def start_server(self):
+        async def advancedsearch(request):
+            self.hits.append(request.query_string)
+            return web.json_response(ARCHIVE_PAYLOAD, headers={'Cache-Control': 'max-age=600'})
+        
+        async def validated(request):
+            self.hits.append(request.path)
+            if request.headers.get('If-None-Match') == '"v1"':
+                return web.Response(status=304, headers={'ETag': '"v1"'})
+            return web.Response(text='validated body', headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        
+        async def no_store(request):
+            self.hits.append(request.path)
+            return web.Response(text='secret', headers={'Cache-Control': 'no-store'})
+        
+        async def sized(request):
+            self.hits.append(request.path)
+            return web.Response(body=os.urandom(1500), headers={'Cache-Control': 'max-age=600'})
+        
+        server = web.Application()
+        server.router.add_get('/advancedsearch.php', advancedsearch)
+        server.router.add_get('/validated', validated)
+        server.router.add_get('/no-store', no_store)
+        server.router.add_get('/sized', sized)
+        server.router.add_post('/sized', sized)
+        self.runner = web.AppRunner(server)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.base = f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+    
+    async def stop_server(self):
+        await self.client.close()
+        await self.runner.cleanup()
+    
+    def get(self, path: str, **kwargs) -> bytes:
+        return app.event_loop.run(self.client.request('GET', f"{self.base}{path}", **kwargs))
+    
+    def test_archive_adapter_request_is_served_from_cache(self):
+        adapter = SOURCE_REGISTRY['Internet Archive']
+        spec = adapter.build_request('graph neural networks', 5, {})
+        self.assertIsInstance(spec.params, list)
+        
+        for _ in range(2):
+            body = self.get('/advancedsearch.php', params=spec.params, headers=spec.headers)
+            results = adapter.parse(json.loads(body), 5)
+            self.assertEqual(results[0]['title'], 'Graph neural networks: a survey')
+        
+        self.assertEqual(len(self.hits), 1)
+        self.assertIn('fl[]=identifier', self.hits[0])
+        self.assertEqual(self.client.stats()['127.0.0.1']['cache_hits'], 1)
+        
+        # A different query is a different entry
+        other = adapter.build_request('protein folding', 5, {})
+        self.get('/advancedsearch.php', params=other.params, headers=other.headers)
+        self.assertEqual(len(self.hits), 2)
+    
+    def test_stale_response_is_revalidated(self):
+        self.assertEqual(self.get('/validated'), b'validated body')
+        self.assertEqual(self.get('/validated'), b'validated body')
+        
+        self.assertEqual(len(self.hits), 2)
+        self.assertEqual(self.client.stats()['127.0.0.1']['not_modified'], 1)
+    
+    def test_no_store_is_not_cached(self):
+        self.get('/no-store')
+        self.get('/no-store')
+        self.assertEqual(len(self.hits), 2)
+    
+    def test_store_stays_within_its_byte_budget(self):
+        for i in range(40):
+            self.get('/sized', params={'i': i})
+        size = self.client.cache.size()
+        
+        self.assertLessEqual(size['bytes'], size['max_bytes'])
+        self.assertGreater(self.client.cache.stats['evicted'], 0)
+        # The most recent entry survived eviction
+        self.get('/sized', params={'i': 39})
+        self.assertEqual(len(self.hits), 40)
+        # The running total matches the table
+        self.assertEqual(self.client.cache.total_bytes, size['bytes'])
+    
+    def test_unsafe_request_invalidates_stored_responses(self):
+        self.get('/sized', params={'i': 1})
+        app.event_loop.run(self.client.request('POST', f"{self.base}/sized", data=b'{}'))
+        self.get('/sized', params={'i': 1})
+        
+        self.assertEqual(len(self.hits), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+Research job store tests: polls answered by a worker that does not own the job
+
+Run from the repository root:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+# Keep caches out of the shared temp-dir databases
+os.environ.update(RESEARCH_CACHE_DB='', LOCAL_INDEX_DB='', HTTP_CACHE_DB='')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app
+
+class JobStoreTest(unittest.TestCase):
+
+    def test_other_worker_sees_every_update(self):
+        db_path = os.path.join(tempfile.mkdtemp(), 'research_cache.sqlite3')
+        owner = app.JobStore(app.ResultCache(db_path))
+        poller = app.JobStore(app.ResultCache(db_path))
+        
+        job = {'job_id': 'j1', 'status': 'queued'}
+        owner.save(job).result()
+        self.assertEqual(poller.get('j1')['status'], 'queued')
+        
+        job['status'] = 'completed'
+        owner.save(job).result()
+        self.assertEqual(poller.get('j1')['status'], 'completed')
+    
+    def test_running_job_survives_cache_eviction(self):
+        cache = app.ResultCache('', max_entries=2)
+        jobs = app.JobStore(cache)
+        jobs.save({'job_id': 'j1', 'status': 'running'})
+        for i in range(10):
+            cache.set('research', str(i), {'results': []})
+        
+        self.assertEqual(jobs.get('j1')['status'], 'running')
+    
+    def test_snapshot_is_not_the_live_dict(self):
+        jobs = app.JobStore(app.ResultCache(''))
+        job = {'job_id': 'j1', 'status': 'running', 'partial_results': []}
+        jobs.save(job)
+        job['partial_results'].append({'url': 'https://example.org'})
+        
+        self.assertEqual(jobs.get('j1')['partial_results'], [])
+
+if __name__ == '__main__':
+    unittest.main()
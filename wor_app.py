@@ -8,11 +8,10 @@ from flask_cors import CORS
 import asyncio
 import os
 import requests
-import xml.etree.ElementTree as ET
 from datetime import datetime
 from typing import List, Dict, Any
 from dataclasses import dataclass, asdict
-import json
+from sources import API_KEY_NAMES, SOURCE_REGISTRY, SourceRequest
 
 app = Flask(__name__)
 
@@ -36,210 +35,33 @@ class ResearchResult:
     authors: str = ""
 
 class RealSearchAgent:
-    """SearchAgent with real API integrations"""
+    """SearchAgent with real API integrations, driven by the shared source registry"""
     
     def __init__(self):
-        self.serper_api_key = os.getenv('SERPER_API_KEY')
-        self.brave_api_key = os.getenv('BRAVE_API_KEY')
-        self.semantic_scholar_api_key = os.getenv('SEMANTIC_SCHOLAR_API_KEY')
+        self.keys = {name: os.getenv(name) for name in API_KEY_NAMES}
     
-    def search_serper(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Serper API (Google Search)"""
-        if not self.serper_api_key:
-            return []
-        
-        url = "https://google.serper.dev/search"
-        payload = json.dumps({"q": query, "num": num_results})
-        headers = {
-            'X-API-KEY': self.serper_api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, data=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('organic', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'source_type': 'article',
-                    'published_date': item.get('date', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Serper error: {e}")
-            return []
+    def fetch(self, spec: SourceRequest) -> Any:
+        response = requests.request(spec.method, spec.url, params=spec.params, headers=spec.headers,
+                                    data=spec.body, timeout=10)
+        response.raise_for_status()
+        return response.json() if spec.response_format == 'json' else response.content
     
-    def search_brave(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Brave Search API"""
-        if not self.brave_api_key:
-            return []
-        
-        url = "https://api.search.brave.com/res/v1/web/search"
-        headers = {
-            "Accept": "application/json",
-            "X-Subscription-Token": self.brave_api_key
-        }
-        params = {"q": query, "count": num_results}
-        
-        try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for item in data.get('web', {}).get('results', [])[:num_results]:
-                results.append({
-                    'title': item.get('title', ''),
-                    'url': item.get('url', ''),
-                    'snippet': item.get('description', ''),
-                    'source_type': 'article',
-                    'published_date': item.get('age', '')
-                })
-            return results
-        except Exception as e:
-            print(f"Brave error: {e}")
+    def search_source(self, name: str, query: str, num_results: int = 10) -> List[Dict]:
+        """Search one registry source; failures are logged and return no results"""
+        adapter = SOURCE_REGISTRY[name]
+        if not adapter.enabled(self.keys):
             return []
-    
-    def search_semantic_scholar(self, query: str, num_results: int = 10) -> List[Dict]:
-        """Semantic Scholar API - FREE"""
-        url = "https://api.semanticscholar.org/graph/v1/paper/search"
-        headers = {}
-        if self.semantic_scholar_api_key:
-            headers['x-api-key'] = self.semantic_scholar_api_key
-        
-        params = {
-            'query': query,
-            'limit': num_results,
-            'fields': 'title,authors,year,abstract,url,publicationDate'
-        }
         
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            results = []
-            for paper in data.get('data', []):
-                authors = ', '.join([author['name'] for author in paper.get('authors', [])[:3]])
-                if len(paper.get('authors', [])) > 3:
-                    authors += ' et al.'
-                
-                results.append({
-                    'title': paper.get('title', ''),
-                    'url': paper.get('url', ''),
-                    'snippet': (paper.get('abstract', '')[:300] + '...') if paper.get('abstract') else '',
-                    'source_type': 'paper',
-                    'published_date': paper.get('publicationDate', '') or str(paper.get('year', '')),
-                    'authors': authors
-                })
-            return results
+            payload = self.fetch(adapter.build_request(query, num_results, self.keys))
+            if adapter.follow_up:
+                spec = adapter.follow_up(payload, self.keys)
+                if spec is None:
+                    return []
+                payload = self.fetch(spec)
+            return adapter.parse(payload, num_results)
         except Exception as e:
-            print(f"Semantic Scholar error: {e}")
-            return []
-    
-    def search_arxiv(self, query: str, num_results: int = 10) -> List[Dict]:
-        """arXiv API - FREE"""
-        base_url = 'http://export.arxiv.org/api/query'
-        params = {
-            'search_query': f'all:{query}',
-            'start': 0,
-            'max_results': num_results,
-            'sortBy': 'relevance'
-        }
-        
-        try:
-            response = requests.get(base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            root = ET.fromstring(response.content)
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
-            }
-            
-            results = []
-            for entry in root.findall('atom:entry', ns):
-                title = entry.find('atom:title', ns).text.strip().replace('\n', ' ')
-                summary = entry.find('atom:summary', ns).text.strip().replace('\n', ' ')
-                link = entry.find('atom:id', ns).text.strip()
-                published = entry.find('atom:published', ns).text.strip()[:10]
-                
-                authors = [author.find('atom:name', ns).text 
-                          for author in entry.findall('atom:author', ns)[:3]]
-                authors_str = ', '.join(authors)
-                if len(entry.findall('atom:author', ns)) > 3:
-                    authors_str += ' et al.'
-                
-                results.append({
-                    'title': title,
-                    'url': link,
-                    'snippet': summary[:300] + '...',
-                    'source_type': 'paper',
-                    'published_date': published,
-                    'authors': authors_str
-                })
-            return results
-        except Exception as e:
-            print(f"arXiv error: {e}")
-            return []
-    
-    def search_pubmed(self, query: str, num_results: int = 10) -> List[Dict]:
-        """PubMed API - FREE"""
-        search_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
-        search_params = {
-            'db': 'pubmed',
-            'term': query,
-            'retmax': num_results,
-            'retmode': 'json'
-        }
-        
-        try:
-            search_response = requests.get(search_url, params=search_params, timeout=10)
-            search_response.raise_for_status()
-            search_data = search_response.json()
-            ids = search_data.get('esearchresult', {}).get('idlist', [])
-            
-            if not ids:
-                return []
-            
-            fetch_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-            fetch_params = {
-                'db': 'pubmed',
-                'id': ','.join(ids),
-                'retmode': 'json'
-            }
-            
-            fetch_response = requests.get(fetch_url, params=fetch_params, timeout=10)
-            fetch_response.raise_for_status()
-            fetch_data = fetch_response.json()
-            
-            results = []
-            for pmid in ids:
-                paper = fetch_data.get('result', {}).get(pmid, {})
-                
-                authors = []
-                for author in paper.get('authors', [])[:3]:
-                    authors.append(author.get('name', ''))
-                authors_str = ', '.join(authors)
-                if len(paper.get('authors', [])) > 3:
-                    authors_str += ' et al.'
-                
-                results.append({
-                    'title': paper.get('title', ''),
-                    'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
-                    'snippet': paper.get('source', ''),
-                    'source_type': 'paper',
-                    'published_date': paper.get('pubdate', ''),
-                    'authors': authors_str
-                })
-            return results
-        except Exception as e:
-            print(f"PubMed error: {e}")
+            print(f"{name} error: {e}")
             return []
     
     def search_all(self, query: str, num_results: int = 10) -> List[Dict]:
@@ -247,23 +69,11 @@ class RealSearchAgent:
         all_results = []
         per_source = max(3, num_results // 4)
         
-        # Always use free APIs
-        print("Searching Semantic Scholar...")
-        all_results.extend(self.search_semantic_scholar(query, per_source))
-        
-        print("Searching arXiv...")
-        all_results.extend(self.search_arxiv(query, per_source))
-        
-        print("Searching PubMed...")
-        all_results.extend(self.search_pubmed(query, per_source))
-        
-        # Use paid APIs if available
-        if self.serper_api_key:
-            print("Searching with Serper...")
-            all_results.extend(self.search_serper(query, per_source))
-        elif self.brave_api_key:
-            print("Searching with Brave...")
-            all_results.extend(self.search_brave(query, per_source))
+        # Free academic APIs, then whichever paid web search is configured
+        for name in ('Semantic Scholar', 'arXiv', 'PubMed', 'General Web', 'Brave Search'):
+            if SOURCE_REGISTRY[name].enabled(self.keys):
+                print(f"Searching {name}...")
+                all_results.extend(self.search_source(name, query, per_source))
         
         return all_results
 
@@ -278,7 +88,7 @@ class FilterAgent:
         
         score = (title_match * 0.7 + snippet_match * 0.3)
         
-        if result['source_type'] in ['paper', 'report']:
+        if result['source_type'] in ['paper', 'report', 'academic']:
             score *= 1.2
         
         return min(score, 1.0)